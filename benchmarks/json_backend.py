@@ -0,0 +1,59 @@
+"""Compare the JSON backends decoding a large synthetic DUPLA response.
+
+Run with ``python benchmarks/json_backend.py [number of records]``.
+"""
+import importlib.util
+import json
+import sys
+import timeit
+from types import SimpleNamespace
+
+from dupla.endpoint import _parse_response_data
+from dupla.json_backend import JSON_BACKENDS, get_json_loads
+from dupla.streaming import iter_json_array
+
+
+def synthetic_response(records: int) -> bytes:
+    data = [
+        {
+            "VirksomhedSENummer": f"{i % 10**8:08d}",
+            "VirksomhedCVRNummer": f"{(i * 7) % 10**8:08d}",
+            "AfregningPeriodeForholdPeriodeStartDato": "2023-01-01",
+            "AfregningPeriodeForholdPeriodeSlutDato": "2023-03-31",
+            "MomsAngivelseAfgiftTilsvarBeløb": i * 1.25,
+            "MomsAngivelseSalgsMomsBeløb": i * 3.5,
+            "AngivelseTypeNavn": "Ordinær angivelse",
+            "Rettet": i % 3 == 0,
+            "Koder": [i % 5, i % 7, i % 11],
+        }
+        for i in range(records)
+    ]
+    return json.dumps({"data": data}).encode()
+
+
+def main(records: int = 100_000, repeat: int = 5) -> None:
+    content = synthetic_response(records)
+    response = SimpleNamespace(content=content)
+    print(f"{records} records, {len(content) / 1e6:.1f} MB, best of {repeat}")
+
+    for name in JSON_BACKENDS:
+        if importlib.util.find_spec(name) is None:
+            print(f"  {name:<10} not installed")
+            continue
+        loads = get_json_loads(name)
+        seconds = min(
+            timeit.repeat(
+                lambda: _parse_response_data(response, loads=loads), number=1, repeat=repeat
+            )
+        )
+        print(f"  {name:<10} {seconds * 1000:8.1f} ms")
+
+    chunks = [content[i : i + 65536] for i in range(0, len(content), 65536)]
+    seconds = min(
+        timeit.repeat(lambda: sum(1 for _ in iter_json_array(chunks)), number=1, repeat=repeat)
+    )
+    print(f"  {'streaming':<10} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -3,9 +3,22 @@ from .base import *
 from .endpoint import *
 from .exceptions import *
 from .api_keys import *
+from .async_endpoint import *
 
-from . import payload
+from .ratelimit import *
+from .circuit_breaker import *
 
-extra = ["payload"]
+from . import batching, cache, columnar, deadline, payload, response, token_store
 
-__all__ = version.__all__ + endpoint.__all__ + exceptions.__all__ + api_keys.__all__ + extra
+extra = ["batching", "cache", "columnar", "deadline", "payload", "response", "token_store"]
+
+__all__ = (
+    version.__all__
+    + endpoint.__all__
+    + async_endpoint.__all__
+    + ratelimit.__all__
+    + circuit_breaker.__all__
+    + exceptions.__all__
+    + api_keys.__all__
+    + extra
+)
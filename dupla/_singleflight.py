@@ -0,0 +1,56 @@
+import copy
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Generic, TypeVar
+
+from .deadline import current_deadline
+from .exceptions import DuplaDeadlineExceeded
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces identical calls in flight: the first caller of a key (the leader) runs the
+    function, while later callers of the same key wait for the leader's result or exception.
+    The followers get a deep copy of the result, so callers may modify their data.
+    A follower waits no longer than its own deadline, c.f. `dupla.deadline.deadline_scope`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            deadline = current_deadline()
+            if deadline is None:
+                return copy.deepcopy(future.result())
+            try:
+                return copy.deepcopy(future.result(timeout=deadline.remaining()))
+            except FutureTimeoutError:
+                raise DuplaDeadlineExceeded(
+                    f"The deadline of {deadline.seconds} seconds was exceeded while waiting "
+                    f"for an identical request in flight"
+                ) from None
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
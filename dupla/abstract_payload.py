@@ -1,11 +1,13 @@
 import abc
-from datetime import datetime
-from typing import Any, Dict, Optional
-from urllib.parse import urljoin
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple, Type, Union
+from urllib.parse import quote, urlencode, urljoin
 
-from pydantic import BaseModel, ConfigDict, Field, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer, model_validator
 
 from .api_keys import DuplaApiKeys
+from .custom_types import validate_ids
 from .timestamp import as_utc
 
 ALIAS_MAPPING: Dict[str, str] = {
@@ -34,31 +36,290 @@ ALIAS_MAPPING: Dict[str, str] = {
 }
 
 
+# Fields holding lists of IDs, which may be split into several requests
+ID_FIELDS: Tuple[str, ...] = ("se", "cvr", "cpr")
+# The number of digits of the IDs
+ID_LENGTHS: Dict[str, int] = {"se": 8, "cvr": 8, "cpr": 10}
+
+
+# A date window is a fixed length, or a calendar period
+DATE_WINDOW_T = Union[timedelta, Literal["month", "quarter", "year"]]
+_PERIOD_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+
+def split_date_range(start: date, end: date, window: DATE_WINDOW_T) -> List[Tuple[date, date]]:
+    """Split the inclusive date range into consecutive, non-overlapping inclusive windows.
+    Calendar windows ("month", "quarter", "year") follow the calendar, so the first and last
+    windows may be shorter.
+
+    Args:
+        start (date): The first date of the range.
+        end (date): The last date of the range.
+        window (Union[timedelta, str]): The length of the windows, either a `timedelta`
+            of at least one day, or one of "month", "quarter" or "year".
+
+    Returns:
+        List[Tuple[date, date]]: The first and last date of each window.
+    """
+    if isinstance(window, timedelta):
+        if window < timedelta(days=1):
+            raise ValueError(f"The date window must be at least one day, got {window}")
+    elif window not in _PERIOD_MONTHS:
+        raise ValueError(f"Unknown date window {window!r}")
+
+    windows = []
+    while start <= end:
+        if isinstance(window, timedelta):
+            next_start = start + timedelta(days=window.days)
+        else:
+            months = _PERIOD_MONTHS[window]
+            # First day of the next calendar period
+            month_index = start.year * 12 + (start.month - 1) // months * months + months
+            next_start = date(month_index // 12, month_index % 12 + 1, 1)
+        windows.append((start, min(next_start - timedelta(days=1), end)))
+        start = next_start
+    return windows
+
+
 def _get_alias(name: str) -> str:
     """Get the mapping between the Pydantic field name and the Dupla key name."""
     return ALIAS_MAPPING.get(name, name)
 
 
 class BasePayload(BaseModel, abc.ABC):
-    """Base Payload Pydantic model"""
+    """Base Payload Pydantic model.
+
+    Payloads with long ID lists are split into several requests, c.f. `get_payload_chunks`.
+    The limits can be changed per payload class with the class variables:
+
+    * ``chunk_size``: Maximum number of IDs per request. None disables the splitting.
+    * ``max_url_length``: Maximum length of the encoded request URL.
+
+    Payloads with a date range may also be split into date windows, c.f. ``date_range_fields``.
+
+    With a response cache, ``cache_ttl`` sets how long the data for the payload class is valid.
+
+    Set ``deduplicate_ids`` to remove repeated IDs from the ID lists of the payload class.
+
+    ``response_model`` is the Pydantic model of the records returned for the payload class,
+    c.f. `DuplaAccess.get_models`.
+
+    Many payloads which only differ in the IDs are created with `template` and `with_ids`,
+    which validate the other fields once. The serialized payload is cached on the instance.
+    """
 
     model_config = ConfigDict(alias_generator=_get_alias, populate_by_name=True, extra="forbid")
 
+    chunk_size: ClassVar[Optional[int]] = 500
+    max_url_length: ClassVar[int] = 6000
+    # The (from, to) fields of the date range which may be split into windows
+    date_range_fields: ClassVar[Optional[Tuple[str, str]]] = None
+    # Seconds the data may be served from a response cache, None for the cache default
+    cache_ttl: ClassVar[Optional[float]] = None
+    # Remove repeated IDs from the ID lists, keeping the first occurrence
+    deduplicate_ids: ClassVar[bool] = False
+    # The model of the records of the response, c.f. dupla.response
+    response_model: ClassVar[Optional[Type[BaseModel]]] = None
+
+    # The cached result of get_payload, reset when a field is set. It holds its own copies of
+    # the list fields, e.g. the ID lists, which are compared to the fields to detect changes
+    # in place.
+    _serialized: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
     @property
     @abc.abstractmethod
     def default_endpoint(self) -> str:
         """The default endpoint for the payload"""
         # Solution from: https://github.com/pydantic/pydantic/discussions/2410#discussioncomment-408613
 
+    @model_validator(mode="after")
+    def _deduplicate_ids(self) -> "BasePayload":
+        if self.deduplicate_ids:
+            for name in ID_FIELDS:
+                ids = getattr(self, name, None)
+                if ids:
+                    setattr(self, name, list(dict.fromkeys(ids)))
+        return self
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._serialized = None
+
+    def __eq__(self, other: Any) -> bool:
+        # The cached serialization does not take part in the comparison
+        if isinstance(other, BasePayload):
+            return type(self) is type(other) and self.__dict__ == other.__dict__
+        return NotImplemented
+
+    def model_copy(
+        self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False
+    ) -> "BasePayload":
+        payload = super().model_copy(update=update, deep=deep)
+        if update:
+            payload._serialized = None
+        return payload
+
+    @classmethod
+    def template(cls, **fields: Any) -> "BasePayload":
+        """Create a payload without IDs, to be used with `with_ids`.
+        The ID lists not given are set to empty lists.
+
+        Args:
+            **fields: The fields shared by the payloads.
+
+        Returns:
+            BasePayload: The validated payload.
+        """
+        empty = {
+            name: []
+            for name in ID_FIELDS
+            if name in cls.model_fields and name not in fields and _get_alias(name) not in fields
+        }
+        return cls(**fields, **empty)
+
+    def with_ids(self, **ids: List[Any]) -> "BasePayload":
+        """Get a copy of the payload with new ID lists, e.g. ``template.with_ids(se=[...])``.
+        Only the new ID lists are validated, c.f. `dupla.custom_types.validate_ids`,
+        and the serialized payload is derived from the cached one of this payload.
+
+        Args:
+            **ids: The new ID lists, by field name (``se``, ``cvr`` or ``cpr``).
+
+        Returns:
+            BasePayload: The new payload.
+        """
+        update = {}
+        for name, values in ids.items():
+            if name not in ID_FIELDS or name not in type(self).model_fields:
+                raise ValueError(f"{type(self).__name__} has no ID list {name!r}")
+            update[name] = validate_ids(values, ID_LENGTHS[name], self.deduplicate_ids)
+
+        # The other list fields are copied as well, so the payloads don't share them
+        for name, value in self.__dict__.items():
+            if isinstance(value, list) and name not in update:
+                update[name] = list(value)
+
+        serialized = self.get_payload()
+        for name, values in update.items():
+            serialized[_get_alias(name)] = list(values)
+        # Skip the reset of the cache in model_copy, as it is set right after
+        payload = BaseModel.model_copy(self, update=update)
+        payload.__pydantic_private__["_serialized"] = serialized
+        return payload
+
     def get_payload(self) -> Dict[str, Any]:
         """Get the payload in a json-able format.
-        Excludes None values."""
-        return self.model_dump(
-            mode="json",
-            exclude=["default_endpoint"],
-            by_alias=True,
-            exclude_none=True,
-        )
+        Excludes None values. The result is cached until a field is set, or a list field
+        (e.g. an ID list) is changed in place."""
+        # The private attributes are read directly, as attribute access is slow
+        serialized = self.__pydantic_private__["_serialized"]
+        if serialized is None or not self._serialized_lists_match(serialized):
+            serialized = self.model_dump(
+                mode="json",
+                exclude=["default_endpoint"],
+                by_alias=True,
+                exclude_none=True,
+            )
+            self.__pydantic_private__["_serialized"] = serialized
+        # A copy, including the lists, as the callers may change it
+        return {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in serialized.items()
+        }
+
+    def _serialized_lists_match(self, serialized: Dict[str, Any]) -> bool:
+        """Check that the list fields, e.g. the ID lists, have not been changed in place since
+        they were serialized. The list fields are the only mutable fields, and hold values
+        which are serialized unchanged, i.e. strings and integers."""
+        for name, value in self.__dict__.items():
+            if isinstance(value, list) and serialized.get(_get_alias(name)) != value:
+                return False
+        return True
+
+    def get_id_field(self) -> Optional[str]:
+        """Get the name of the ID list field which requests are split on.
+        If several ID lists are set, the longest one is used, and the others are sent unchanged
+        with every request. Returns None if no ID list is set."""
+        lengths = {
+            name: len(getattr(self, name))
+            for name in ID_FIELDS
+            if name in type(self).model_fields and getattr(self, name)
+        }
+        if not lengths:
+            return None
+        return max(lengths, key=lengths.get)
+
+    def get_date_windows(self, window: DATE_WINDOW_T) -> List[Tuple[date, date]]:
+        """Get the windows the date range of the payload is split into.
+        Returns an empty list if the payload has no date range, or the range is open.
+
+        Args:
+            window (Union[timedelta, str]): The length of the windows, c.f. `split_date_range`.
+
+        Returns:
+            List[Tuple[date, date]]: The first and last date of each window.
+        """
+        if self.date_range_fields is None:
+            return []
+        start, end = (getattr(self, name) for name in self.date_range_fields)
+        if start is None or end is None:
+            return []
+        return split_date_range(start, end, window)
+
+    def get_payload_chunks(
+        self, endpoint: str, date_window: Optional[DATE_WINDOW_T] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the payload split into several payloads with a part of the ID list each,
+        such that no request has more than ``chunk_size`` IDs or an URL longer than
+        ``max_url_length``. A payload within the limits is returned as the only element.
+
+        If a ``date_window`` is given, the date range of the payload is split into windows as
+        well, c.f. `get_date_windows`, and each window is split on the ID list.
+
+        Args:
+            endpoint (str): The endpoint URL the payload is sent to.
+            date_window (Optional[Union[timedelta, str]]): Split the date range of the payload
+                into windows of this length. Defaults to None.
+
+        Returns:
+            List[Dict[str, Any]]: The payloads in a json-able format.
+        """
+        payload = self.get_payload()
+        if date_window is None:
+            return self._split_ids(payload, endpoint)
+
+        windows = self.get_date_windows(date_window)
+        if len(windows) <= 1:
+            return self._split_ids(payload, endpoint)
+        from_key, to_key = (_get_alias(name) for name in self.date_range_fields)
+        return [
+            chunk
+            for start, end in windows
+            for chunk in self._split_ids(
+                {**payload, from_key: start.isoformat(), to_key: end.isoformat()}, endpoint
+            )
+        ]
+
+    def _split_ids(self, payload: Dict[str, Any], endpoint: str) -> List[Dict[str, Any]]:
+        """Split the serialized payload on the ID list, c.f. `get_payload_chunks`."""
+        field = self.get_id_field()
+        if field is None or self.chunk_size is None:
+            return [payload]
+
+        key = _get_alias(field)
+        ids = payload[key]
+        endpoint_length = len(quote(endpoint, safe=":/")) + 1  # Including the "?"
+        url_length = endpoint_length + len(urlencode(payload, doseq=True))
+        if len(ids) <= self.chunk_size and url_length <= self.max_url_length:
+            return [payload]
+
+        # Estimate the number of IDs fitting in the URL from their mean encoded length
+        ids_length = len(urlencode({key: ids}, doseq=True)) + 1  # Including the "&"
+        available_length = self.max_url_length - (url_length - ids_length)
+        ids_per_url = math.floor(available_length * len(ids) / ids_length)
+        size = max(min(self.chunk_size, ids_per_url), 1)
+        return [{**payload, key: ids[i : i + size]} for i in range(0, len(ids), size)]
 
     @classmethod
     def endpoint_from_base_url(cls, base_url: str) -> str:
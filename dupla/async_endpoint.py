@@ -0,0 +1,309 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from .abstract_payload import DATE_WINDOW_T
+from .base import BAT_TOKEN_FORM, _api_headers, _parse_token_payload, get_pkcs12_adapter
+from .circuit_breaker import CircuitBreaker, circuit_key, is_failure
+from .endpoint import RESPONSE_T, BulkResult, _merge_windows, _parse_response_data
+from .exceptions import DuplaApiAuthenticationException
+from .json_backend import get_json_loads
+from .payload import BasePayload
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, is_retryable_status, parse_header_retry_after
+from .timestamp import get_utc_now
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+logger = logging.getLogger(__file__)
+
+__all__ = ["AsyncDuplaAccess"]
+
+
+class AsyncDuplaAccess:
+    """
+    Asyncio client for accessing the Dataudveklspingsplatformen API (Dupla).
+    Uses the same payload classes as `DuplaAccess`, and requires ``httpx``
+    (``pip install dupla[async]``).
+
+    The client should be closed with ``aclose``, or used as an async context manager::
+
+        async with AsyncDuplaAccess(...) as api:
+            data = await api.get_data(payload)
+    """
+
+    def __init__(
+        self,
+        transaction_id: str,
+        agreement_id: str,
+        pkcs12_filename: str,
+        pkcs12_password: str,
+        billetautomat_url: str,
+        base_url: str = r"https://api.skat.dk",
+        jwt_token_expiration_overlap: int = 5,
+        max_tries: int = 8,
+        max_concurrency: int = 100,
+        rate_limiter: Optional[RateLimiter] = None,
+        client: Optional["httpx.AsyncClient"] = None,
+        bat_client: Optional["httpx.AsyncClient"] = None,
+        json_backend: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        """Instantiates new asyncio DUPLA API endpoint client.
+        Args:
+            transaction_id (str): An ID used to correlate requests across the API.
+                Should be constant for IKP-DA.
+            agreement_id (str): An ID/token supplied by the API provider.
+            pkcs12_filename (str): Path to PKCS12 certificate file.
+            pkcs12_password (str): Password for PKCS12 certificate file.
+            billetautomat_url (str): Endpoint to the authentication service for requesting
+                JWT tokens.
+            base_url (str): The HTTP(S) endpoint of the API.
+            jwt_token_expiration_overlap (int): The overlap time for token expiration time
+                (in seconds) to avoid situations where token is almost expired during the check
+                and will be rejected in a next request. Defaults to 5 seconds.
+            max_tries (int): Maximum number of attempts of a request, when no
+                ``retry_policy`` is given. Defaults to 8.
+            max_concurrency (int): Maximum number of requests in flight. Defaults to 100.
+            rate_limiter (Optional[RateLimiter]): A rate limiter keyed on the endpoint, which
+                may be shared with other clients. Only the rate and the ``Retry-After`` pauses
+                apply, the number of requests in flight is limited by ``max_concurrency``.
+                Defaults to None.
+            client (Optional[httpx.AsyncClient]): The client used for the API requests.
+                Defaults to a new client with a connection pool of ``max_concurrency``.
+            bat_client (Optional[httpx.AsyncClient]): The client used for the authentication
+                service. Defaults to a new client using the mTLS context of the certificate.
+            json_backend (Optional[str]): The JSON decoder of the responses,
+                c.f. `DuplaAccess`. Defaults to None (the fastest one installed).
+            retry_policy (Optional[RetryPolicy]): When and how often failed requests are
+                retried, c.f. `DuplaAccess`. Defaults to a ``RetryPolicy(max_tries=max_tries)``.
+            circuit_breaker (Optional[CircuitBreaker]): A circuit breaker keyed on the path of
+                the endpoint, c.f. `DuplaAccess`. Defaults to None.
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncDuplaAccess requires httpx, install it with 'pip install dupla[async]'"
+            )
+        self.transaction_id = transaction_id
+        self.agreement_id = agreement_id
+        self.billetautomat_url = billetautomat_url
+        self.base_url = base_url
+        self.jwt_token_expiration_overlap = jwt_token_expiration_overlap
+        self.max_tries = max_tries
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_tries)
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self._json_loads = get_json_loads(json_backend)
+        self.token_expiration_time: Optional[datetime] = None
+        self.jwt_token: Optional[str] = None
+
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+                )
+            )
+        if bat_client is None:
+            ssl_context = get_pkcs12_adapter(pkcs12_filename, pkcs12_password).ssl_context
+            bat_client = httpx.AsyncClient(verify=ssl_context)
+        self._client = client
+        self._bat_client = bat_client
+
+        # Created on first use, so they belong to the running event loop
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP clients."""
+        await self._client.aclose()
+        await self._bat_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    def get_endpoint(self, payload: BasePayload) -> str:
+        """Retrieve the endpoint URL."""
+        return payload.__class__.endpoint_from_base_url(self.base_url)
+
+    async def get_data(
+        self,
+        payload: BasePayload,
+        endpoint: Optional[str] = None,
+        date_window: Optional[DATE_WINDOW_T] = None,
+    ) -> List[RESPONSE_T]:
+        """Request the server for data. Payloads with long ID lists are split into several
+        concurrent requests, c.f. `BasePayload.get_payload_chunks`.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                If not provided, it defaults to the url join of the base URL and
+                the payload default URL. Defaults to None.
+            date_window (Optional[Union[timedelta, str]], optional): Split the date range of
+                the payload into windows of this length, c.f. `DuplaAccess.get_data`.
+                Defaults to None.
+        Returns:
+            List[Dict[str, Any]]: A JSON list representing data as returned by the API.
+        """
+        if endpoint is None:
+            endpoint = self.get_endpoint(payload)
+        payloads_serialized = payload.get_payload_chunks(endpoint, date_window=date_window)
+        parts = await asyncio.gather(*(self._run_payload(p, endpoint) for p in payloads_serialized))
+        if date_window is not None and len(payloads_serialized) > 1:
+            return _merge_windows(payload, payloads_serialized, list(parts))
+        return [record for part in parts for record in part]
+
+    async def get_data_many(
+        self, payloads: Iterable[BasePayload], ordered: bool = True
+    ) -> List[BulkResult]:
+        """Request the server for data for many payloads concurrently.
+        The number of requests in flight is bounded by ``max_concurrency``.
+
+        Args:
+            payloads (Iterable[BasePayload]): The Pydantic payload models.
+            ordered (bool, optional): Return the results in the order of the input. Otherwise
+                the results are returned in the order they complete. Defaults to True.
+        Returns:
+            List[BulkResult]: One result per payload, holding either the data or the error.
+        """
+
+        async def _run(index: int, payload: BasePayload) -> BulkResult:
+            try:
+                return BulkResult(index, payload, data=await self.get_data(payload))
+            except Exception as e:
+                logger.debug("Payload %d failed: %s", index, e)
+                return BulkResult(index, payload, error=e)
+
+        tasks = [asyncio.ensure_future(_run(i, p)) for i, p in enumerate(payloads)]
+        if ordered:
+            return list(await asyncio.gather(*tasks))
+        return [await task for task in asyncio.as_completed(tasks)]
+
+    async def get(self, url: str, params: Optional[Dict] = None, **kwargs: Any) -> "httpx.Response":
+        """Sends a GET request, handling authentication and API headers.
+
+        Arguments:
+            url (str): URL of the request.
+            params (Optional[Dict]): Query parameters of the request.
+            **kwargs (Optional[Dict]): Optional arguments that `httpx.AsyncClient.get` takes.
+
+        Returns:
+            httpx.Response: The response.
+        """
+        jwt_token = await self._get_token()
+        headers = _api_headers(self.transaction_id, self.agreement_id, jwt_token)
+        headers.update(kwargs.pop("headers", None) or {})
+        return await self._client.get(url, params=params, headers=headers, **kwargs)
+
+    async def _run_payload(self, payload: Dict[str, Any], endpoint: str) -> List[RESPONSE_T]:
+        """Execute a given payload with retries. No conversion is done on the payload.
+        Mirrors `DuplaAccess`: network errors, HTTP 5xx and 429 are retried as decided by the
+        `RetryPolicy`, which respects the ``Retry-After`` header on HTTP 429 and 503."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        state = self.retry_policy.start()
+        while True:
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    if self.rate_limiter is not None:
+                        await self._wait_for_rate_limit(endpoint)
+                    response = await self._send(payload, endpoint)
+                if response.status_code in (429, 503):
+                    retry_after = parse_header_retry_after(response.headers, fallback=None)
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.pause(
+                            endpoint, parse_header_retry_after(response.headers)
+                        )
+                response.raise_for_status()
+                return _parse_response_data(response, loads=self._json_loads)
+            except httpx.HTTPStatusError as e:
+                delay = None
+                if is_retryable_status(e.response.status_code):
+                    delay = self.retry_policy.next_delay(state, retry_after)
+                if delay is None:
+                    self.retry_policy.fail(state, e)
+                    raise
+                logger.debug("Retrying %s after HTTP %d", endpoint, e.response.status_code)
+            except httpx.TransportError as e:
+                delay = self.retry_policy.next_delay(state)
+                if delay is None:
+                    self.retry_policy.fail(state, e)
+                    raise
+                logger.debug("Retrying %s after %s", endpoint, e)
+            await asyncio.sleep(delay)
+
+    async def _send(self, payload: Dict[str, Any], endpoint: str) -> "httpx.Response":
+        """Send one attempt of a request, through the circuit breaker if any."""
+        if self.circuit_breaker is None:
+            return await self.get(endpoint, params=payload)
+        key = circuit_key(endpoint)
+        self.circuit_breaker.acquire(key)
+        failed = None
+        try:
+            response = await self.get(endpoint, params=payload)
+            failed = is_failure(response)
+            return response
+        except httpx.TransportError:
+            failed = True
+            raise
+        finally:
+            self.circuit_breaker.release(key, failed)
+
+    async def _wait_for_rate_limit(self, endpoint: str) -> None:
+        """Wait until the rate limiter allows a request to the endpoint."""
+        delay = self.rate_limiter.reserve(endpoint)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            if self.rate_limiter.pause_remaining(endpoint) <= 0:
+                return
+            # Paused while waiting, c.f. `RateLimiter.acquire`
+            delay = self.rate_limiter.reserve(endpoint)
+
+    async def _get_token(self) -> str:
+        """Get a valid JWT token, retrieving a new one if it is not present or is expired.
+        Only one task retrieves the token, while the others wait for it."""
+        if self._is_token_present() and not self._is_token_expired():
+            return self.jwt_token
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # The token may have been refreshed while waiting for the lock.
+            if not self._is_token_present() or self._is_token_expired():
+                await self._authenticate()
+        return self.jwt_token
+
+    async def _authenticate(self) -> None:
+        """Retrieves a JWT token from the authentication service (BAT2),
+        c.f. `DuplaApiBase._authenticate`."""
+        headers = {"x-transaktion-id": self.transaction_id}
+        result = await self._bat_client.post(
+            self.billetautomat_url, headers=headers, data=BAT_TOKEN_FORM
+        )
+        if not result.is_success:
+            raise DuplaApiAuthenticationException(
+                f"JWT error: fetching the token failed, "
+                f"http code: {result.status_code}, "
+                f"message: {result.content.decode()}"
+            )
+        access_token, expires_in = _parse_token_payload(result.json())
+        self.jwt_token = access_token
+        self.token_expiration_time = get_utc_now() + timedelta(seconds=expires_in)
+
+    def _is_token_present(self) -> bool:
+        return self.jwt_token is not None and self.token_expiration_time is not None
+
+    def _is_token_expired(self) -> bool:
+        return get_utc_now() >= self.token_expiration_time - timedelta(
+            seconds=self.jwt_token_expiration_overlap
+        )
@@ -1,20 +1,191 @@
 import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 from uuid import uuid4
 
 import requests
 import requests_pkcs12
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.serialization import pkcs12
+from requests.adapters import HTTPAdapter
 
-from .exceptions import DuplaApiAuthenticationException
+from .deadline import TIMEOUT_T, current_deadline
+from .exceptions import DuplaApiAuthenticationException, DuplaDeadlineExceeded
 from .timestamp import get_utc_now
+from .token_store import StoredToken, TokenStore, token_store_key
 
 __all__ = [
     "DuplaApiBase",
+    "TokenRefreshStats",
+    "get_pkcs12_adapter",
+    "clear_pkcs12_cache",
+    "get_certificate_fingerprint",
 ]
 
 logger = logging.getLogger(__file__)
 
+# The default (connect, read) timeout in seconds of the requests to the API and to BAT
+DEFAULT_TIMEOUT = (10.0, 60.0)
+
+
+def _file_signature(filename: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """Identify a file by its path, modification time and size, so a replaced
+    certificate file is not served from the cache."""
+    path = os.path.abspath(filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=None)
+def _cached_pkcs12_adapter(
+    signature: Tuple[str, Optional[int], Optional[int]], pkcs12_filename: str, pkcs12_password: str
+) -> requests_pkcs12.Pkcs12Adapter:
+    return requests_pkcs12.Pkcs12Adapter(
+        pkcs12_filename=pkcs12_filename,
+        pkcs12_password=pkcs12_password,
+    )
+
+
+def get_pkcs12_adapter(pkcs12_filename: str, pkcs12_password: str) -> requests_pkcs12.Pkcs12Adapter:
+    """Get the mTLS adapter for a PKCS12 certificate file.
+    The certificate is only decoded once per (file, password) in the process, and
+    the adapter (including its SSL context and connection pool) is shared between clients.
+
+    Arguments:
+        pkcs12_filename (str): Path to PKCS12 certificate file.
+        pkcs12_password (str): Password for PKCS12 certificate file.
+
+    Returns:
+        requests_pkcs12.Pkcs12Adapter: The shared adapter.
+    """
+    return _cached_pkcs12_adapter(
+        _file_signature(pkcs12_filename), pkcs12_filename, pkcs12_password
+    )
+
+
+@lru_cache(maxsize=None)
+def _cached_certificate_fingerprint(
+    signature: Tuple[str, Optional[int], Optional[int]], pkcs12_filename: str, pkcs12_password: str
+) -> str:
+    with open(pkcs12_filename, "rb") as file:
+        pkcs12_data = file.read()
+    _, certificate, _ = pkcs12.load_key_and_certificates(pkcs12_data, pkcs12_password.encode())
+    return certificate.fingerprint(hashes.SHA256()).hex()
+
+
+def get_certificate_fingerprint(pkcs12_filename: str, pkcs12_password: str) -> str:
+    """Get the SHA-256 fingerprint of the certificate in a PKCS12 file.
+    The result is cached per (file, password).
+
+    Arguments:
+        pkcs12_filename (str): Path to PKCS12 certificate file.
+        pkcs12_password (str): Password for PKCS12 certificate file.
+
+    Returns:
+        str: The hex encoded fingerprint.
+    """
+    return _cached_certificate_fingerprint(
+        _file_signature(pkcs12_filename), pkcs12_filename, pkcs12_password
+    )
+
+
+def clear_pkcs12_cache() -> None:
+    """Forget the cached PKCS12 adapters, e.g. after a certificate has been rotated in place."""
+    _cached_pkcs12_adapter.cache_clear()
+    _cached_certificate_fingerprint.cache_clear()
+
+
+# Form fields for requesting a JWT token from the authentication service
+BAT_TOKEN_FORM = {"client_id": "api-gateway", "scope": "openid", "grant_type": "password"}
+
+
+def _api_headers(transaction_id: str, agreement_id: str, jwt_token: str) -> Dict[str, str]:
+    """The headers of a request to the Dupla API. Each request gets a new request ID."""
+    return {
+        "X-Request-ID": str(uuid4()),
+        "X-Transaktions-ID": transaction_id,
+        "UFST-Adgangsgrundlag": f"urn:ufst:adgangsgrundlag:aftale:{agreement_id}",
+        "Authorization": f"Bearer {jwt_token}",
+    }
+
+
+def _parse_token_payload(result_payload: Dict[str, Any]) -> Tuple[str, float]:
+    """Get the access token and its lifetime (in seconds) from the response of the
+    authentication service."""
+    access_token = result_payload.get("access_token")
+    if not access_token:
+        raise DuplaApiAuthenticationException(
+            "JWT error: access_token not present in response payload"
+        )
+    expires_in = result_payload.get("expires_in")
+    if not expires_in:
+        raise DuplaApiAuthenticationException(
+            "JWT error: expires_in not present in response payload"
+        )
+    return access_token, expires_in
+
+
+@dataclass
+class TokenRefreshStats:
+    """Counters for the JWT token refreshes of a client."""
+
+    refresh_count: int = 0
+    failure_count: int = 0
+    total_seconds: float = 0.0
+    last_seconds: Optional[float] = None
+    max_seconds: float = 0.0
+    store_hit_count: int = 0
+
+    @property
+    def mean_seconds(self) -> Optional[float]:
+        """The mean duration of a successful refresh."""
+        if not self.refresh_count:
+            return None
+        return self.total_seconds / self.refresh_count
+
+    def record(self, seconds: float) -> None:
+        self.refresh_count += 1
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+def _run_token_refresher(api_ref: "weakref.ref[DuplaApiBase]", stop: threading.Event) -> None:
+    """Loop of the background token refresher thread. Only a weak reference to the client is
+    kept between refreshes, so the thread stops when the client is garbage collected."""
+    min_delay = 0.0  # The first token is fetched right away
+    retry_delay = 1.0
+    while True:
+        api = api_ref()
+        if api is None:
+            return
+        delay = max(api._seconds_until_refresh(), min_delay)
+        api = None
+        if stop.wait(delay):
+            return
+
+        api = api_ref()
+        if api is None:
+            return
+        try:
+            api._refresh_token_if_due()
+            min_delay = 1.0
+            retry_delay = 1.0
+        except Exception:
+            logger.exception("Background refresh of the JWT token failed")
+            min_delay = retry_delay
+            retry_delay = min(2 * retry_delay, 30.0)
+        api = None
+
 
 class DuplaApiBase:
     """Base class for API acces to the Dataudveklspingsplatformen API (Dupla).
@@ -30,11 +201,38 @@ class DuplaApiBase:
         jwt_token_expiration_overlap (int): The overlap time for token expiration time (in seconds)
             to avoid situations where token is almost expired during the check and will be rejected
             in a next request.
+        pool_connections (int): Number of host connection pools kept by the long-lived session.
+            Defaults to 10.
+        pool_maxsize (int): Maximum number of keep-alive connections kept per host. Should be at
+            least the number of threads sharing the client. Defaults to 10.
+        background_token_refresh (bool): Renew the JWT token in a background thread ahead of
+            its expiration, so requests never wait for the authentication service.
+            Defaults to False.
+        token_refresh_fraction (float): With background refresh, the fraction of the token
+            lifetime (`expires_in`) after which the token is renewed. Defaults to 0.8.
+        token_store (Optional[TokenStore]): A store for sharing the JWT token with other clients
+            (e.g. in other processes) using the same authentication service and certificate.
+            The store is checked for a valid token before requesting a new one from BAT.
+            Defaults to None.
+        timeout (Optional[Union[float, Tuple[float, float]]]): The timeout in seconds of the
+            requests to the API and to the authentication service, either one number or a
+            (connect, read) tuple. The read timeout bounds the wait for each chunk of the
+            response, not the whole response. None disables the timeouts.
+            Defaults to (10, 60).
+
+    Requests made within a `dupla.deadline.deadline_scope` (e.g. ``get_data(...,
+    deadline=...)``) have their timeouts capped by the time left, and raise
+    `DuplaDeadlineExceeded` once it has passed, including while waiting for a token refresh.
+
+    The client owns a long-lived, thread-safe HTTP session, so connections to the API are kept
+    alive and reused across requests. Call `close` (or use the client as a context manager)
+    to release the connections.
     """
 
     transaction_id: str
     agreement_id: str
     _pkcs12_adapter: requests_pkcs12.Pkcs12Adapter
+    _session: requests.Session
 
     def __init__(
         self,
@@ -44,18 +242,113 @@ class DuplaApiBase:
         pkcs12_password: str,
         billetautomat_url: str,
         jwt_token_expiration_overlap: int,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        background_token_refresh: bool = False,
+        token_refresh_fraction: float = 0.8,
+        token_store: Optional[TokenStore] = None,
+        timeout: Optional[TIMEOUT_T] = DEFAULT_TIMEOUT,
     ):
+        if not 0 < token_refresh_fraction <= 1:
+            raise ValueError(
+                f"token_refresh_fraction must be in the range (0, 1], got {token_refresh_fraction}"
+            )
         self.transaction_id = transaction_id
         self.agreement_id = agreement_id
+        self.timeout = timeout
 
-        self._pkcs12_adapter = requests_pkcs12.Pkcs12Adapter(
-            pkcs12_filename=pkcs12_filename,
-            pkcs12_password=pkcs12_password,
-        )
+        self._pkcs12_adapter = get_pkcs12_adapter(pkcs12_filename, pkcs12_password)
         self.billetautomat_url = billetautomat_url
         self.jwt_token_expiration_overlap = jwt_token_expiration_overlap
         self.token_expiration_time: Optional[datetime] = None
         self.jwt_token: Optional[str] = None
+        self.token_refresh_fraction = token_refresh_fraction
+        self._token_lifetime: Optional[timedelta] = None
+        self._token_lock = threading.Lock()
+        self._token_refresh_stats = TokenRefreshStats()
+        # The stats have their own lock, as the token lock is held during the whole refresh
+        self._stats_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_stop = threading.Event()
+
+        self.token_store = token_store
+        self._token_store_key: Optional[str] = None
+        if token_store is not None:
+            self._token_store_key = token_store_key(
+                billetautomat_url, get_certificate_fingerprint(pkcs12_filename, pkcs12_password)
+            )
+
+        self._session = self._build_session(pool_connections, pool_maxsize)
+        self._bat_session = self._build_bat_session()
+
+        if background_token_refresh:
+            self.start_token_refresher()
+
+    @staticmethod
+    def _build_session(pool_connections: int, pool_maxsize: int) -> requests.Session:
+        """Build the long-lived session used for the Dupla API requests.
+        The connection pool is shared between threads, and connections are kept alive."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _build_bat_session(self) -> requests.Session:
+        """Build the long-lived mTLS session to the authentication service (BAT).
+        The connection is kept alive between token refreshes, so a refresh does not
+        need a new mTLS handshake as long as the server keeps the connection open."""
+        session = requests.Session()
+        session.mount(self.billetautomat_url, self._pkcs12_adapter)
+        return session
+
+    @property
+    def token_refresh_stats(self) -> TokenRefreshStats:
+        """A snapshot of how many token refreshes happened and how long they took."""
+        with self._stats_lock:
+            return replace(self._token_refresh_stats)
+
+    def start_token_refresher(self) -> None:
+        """Start renewing the JWT token in a background thread, at `token_refresh_fraction`
+        of the token lifetime. Does nothing if the refresher is already running."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._refresher_stop = threading.Event()
+        self._refresher = threading.Thread(
+            target=_run_token_refresher,
+            args=(weakref.ref(self), self._refresher_stop),
+            name="dupla-token-refresher",
+            daemon=True,
+        )
+        self._refresher.start()
+
+    def stop_token_refresher(self) -> None:
+        """Stop the background token refresher, if running."""
+        self._refresher_stop.set()
+        if self._refresher is not None and self._refresher is not threading.current_thread():
+            self._refresher.join()
+        self._refresher = None
+
+    def close(self) -> None:
+        """Close the underlying HTTP sessions and release the pooled connections."""
+        self.stop_token_refresher()
+        self._session.close()
+        # The mTLS adapter is shared with other clients, so it is not closed with the session.
+        self._bat_session.adapters.pop(self.billetautomat_url, None)
+        self._bat_session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _request_timeout(self) -> Optional[TIMEOUT_T]:
+        """The timeout of the next request, capped by the deadline of the call if any."""
+        deadline = current_deadline()
+        if deadline is None:
+            return self.timeout
+        return deadline.timeout(self.timeout)
 
     def request(self, method, url, **kwargs) -> requests.Response:
         """Constructs and sends a `requests.Request` with appropriate headers
@@ -69,25 +362,23 @@ class DuplaApiBase:
             method (str): HTTP method of the `requests.Request` object
             url (str): URL for the new :class:`Request` object.
             **kwargs (Optional[Dict]): Optional arguments that `requests.request` takes.
+                Defaults to the ``timeout`` of the client.
+
+        Raises:
+            DuplaDeadlineExceeded: If the deadline of the call has passed.
 
         Returns:
             requests.Reponse: A requests Response opject
         """
-        request_id = uuid4()
-        if not self._is_token_present() or self._is_token_expired():
-            self._authenticate()
-
-        headers = {
-            "X-Request-ID": str(request_id),
-            "X-Transaktions-ID": self.transaction_id,
-            "UFST-Adgangsgrundlag": f"urn:ufst:adgangsgrundlag:aftale:{self.agreement_id}",
-            "Authorization": f"Bearer {self.jwt_token}",
-        }
+        jwt_token = self._get_token()
 
-        with requests.Session() as session:
-            session.headers.update(headers)
+        headers = _api_headers(self.transaction_id, self.agreement_id, jwt_token)
+        # Headers are applied per request, as the session is shared between threads.
+        headers.update(kwargs.pop("headers", None) or {})
+        if "timeout" not in kwargs:
+            kwargs["timeout"] = self._request_timeout()
 
-            return session.request(method, url, **kwargs)
+        return self._session.request(method, url, headers=headers, **kwargs)
 
     def get(
         self, url: str, params: Optional[Dict] = None, **kwargs: Dict[str, Any]
@@ -105,44 +396,144 @@ class DuplaApiBase:
         """
         return self.request("get", url, params=params, **kwargs)
 
+    def _get_token(self) -> str:
+        """Get a valid JWT token, retrieving a new one if it is not present or is expired.
+        The refresh is single-flight: one thread fetches the token while the others wait for it,
+        or keep using the current token if it has not yet passed its actual expiration time.
+
+        Returns:
+            str: The JWT token.
+        """
+        if self._is_token_present() and not self._is_token_expired():
+            return self.jwt_token
+
+        blocking = not self._is_token_usable()
+        deadline = current_deadline()
+        if blocking and deadline is not None:
+            # Wait for another thread's refresh no longer than the deadline
+            acquired = self._token_lock.acquire(timeout=deadline.remaining())
+            if not acquired:
+                raise DuplaDeadlineExceeded(
+                    f"The deadline of {deadline.seconds} seconds was exceeded while waiting "
+                    f"for a JWT token"
+                )
+        elif not self._token_lock.acquire(blocking=blocking):
+            # Another thread is refreshing the token, the current one is still accepted.
+            return self.jwt_token
+        try:
+            # The token may have been refreshed while waiting for the lock.
+            if not self._is_token_present() or self._is_token_expired():
+                self._renew_token()
+        finally:
+            self._token_lock.release()
+        return self.jwt_token
+
+    def _refresh_token_if_due(self) -> None:
+        """Refresh the JWT token if it has passed the refresh point of its lifetime.
+        Used by the background refresher."""
+        with self._token_lock:
+            if self._seconds_until_refresh() <= 0:
+                self._renew_token()
+
+    def _seconds_until_refresh(self) -> float:
+        """Seconds until the token should be renewed by the background refresher.
+        The token is renewed at `token_refresh_fraction` of its lifetime, and no later than the
+        point where requests would consider it expired."""
+        expiration, lifetime = self.token_expiration_time, self._token_lifetime
+        if self.jwt_token is None or expiration is None or lifetime is None:
+            return 0.0
+        refresh_at = min(
+            expiration - lifetime * (1 - self.token_refresh_fraction),
+            expiration - timedelta(seconds=self.jwt_token_expiration_overlap),
+        )
+        return max((refresh_at - get_utc_now()).total_seconds(), 0.0)
+
+    def _renew_token(self) -> None:
+        """Renew the JWT token. If a token store is set, a newer valid token from the store is
+        used, and otherwise a freshly retrieved token is saved to the store.
+        Must be called while holding the token lock."""
+        if self.token_store is None:
+            self._timed_authenticate()
+            return
+
+        key = self._token_store_key
+        with self.token_store.lock(key):
+            stored = self.token_store.load(key)
+            if stored is not None and self._is_stored_token_newer(stored):
+                self.jwt_token = stored.access_token
+                self._token_lifetime = timedelta(seconds=stored.expires_in)
+                self.token_expiration_time = stored.expiration_time
+                with self._stats_lock:
+                    self._token_refresh_stats.store_hit_count += 1
+                return
+
+            self._timed_authenticate()
+            try:
+                self.token_store.save(
+                    key,
+                    StoredToken(
+                        access_token=self.jwt_token,
+                        expiration_time=self.token_expiration_time,
+                        expires_in=self._token_lifetime.total_seconds(),
+                    ),
+                )
+            except Exception:
+                logger.warning("Could not save the JWT token to the token store", exc_info=True)
+
+    def _is_stored_token_newer(self, stored: StoredToken) -> bool:
+        """Checks whether a token from the token store is not expired (including the overlap
+        time) and expires later than the current token."""
+        if get_utc_now() >= stored.expiration_time - timedelta(
+            seconds=self.jwt_token_expiration_overlap
+        ):
+            return False
+        return not self._is_token_present() or stored.expiration_time > self.token_expiration_time
+
+    def _timed_authenticate(self) -> None:
+        """Authenticate and record the duration in the refresh statistics.
+        Must be called while holding the token lock."""
+        start = time.perf_counter()
+        try:
+            self._authenticate()
+        except Exception:
+            with self._stats_lock:
+                self._token_refresh_stats.failure_count += 1
+            raise
+        with self._stats_lock:
+            self._token_refresh_stats.record(time.perf_counter() - start)
+
     def _authenticate(self) -> None:
         """Retrieves a JWT token from the authentication service (BAT2) to be used for
         Dupla API requests. The connection to the authentication service is encrypted with mTLS
         and the set certificate. To retrieve a JWT token, the payload must include an `x-transaction-id`
         header and the 3 form fields client_id=api-gateway, scope=openid and grant_type=password
         The token expiration time is set as well for further checks.
+        The current token is kept until the new one has been retrieved successfully.
         """
-        self.token_expiration_time = None
-        self.jwt_token = None
-
         headers = {"x-transaktion-id": self.transaction_id}
-        payload = {"client_id": "api-gateway", "scope": "openid", "grant_type": "password"}
-
-        with requests.Session() as session:
-            session.mount(self.billetautomat_url, self._pkcs12_adapter)
-            result = session.post(self.billetautomat_url, headers=headers, data=payload)
-            if result.ok:
-                result_payload = result.json()
-            else:
-                raise DuplaApiAuthenticationException(
-                    f"JWT error: fetching the token failed, "
-                    f"http code: {result.status_code}, "
-                    f"message: {result.content.decode()}"
-                )
 
-        if access_token := result_payload.get("access_token"):
-            self.jwt_token = access_token
-        else:
-            raise DuplaApiAuthenticationException(
-                "JWT error: access_token not present in response payload"
-            )
-        if expires_in := result_payload.get("expires_in"):
-            self.token_expiration_time = get_utc_now() + timedelta(seconds=expires_in)
+        result = self._bat_session.post(
+            self.billetautomat_url,
+            headers=headers,
+            data=BAT_TOKEN_FORM,
+            timeout=self._request_timeout(),
+        )
+        if result.ok:
+            result_payload = result.json()
         else:
             raise DuplaApiAuthenticationException(
-                "JWT error: expires_in not present in response payload"
+                f"JWT error: fetching the token failed, "
+                f"http code: {result.status_code}, "
+                f"message: {result.content.decode()}"
             )
 
+        access_token, expires_in = _parse_token_payload(result_payload)
+        # The token is set before the expiration time, so a concurrent reader never pairs
+        # the old token with the new expiration time.
+        self.jwt_token = access_token
+        self._token_lifetime = timedelta(seconds=expires_in)
+        self.token_expiration_time = get_utc_now() + self._token_lifetime
+
     def _is_token_present(self) -> bool:
         """Checks whether the JWT token was retrieved and the expiration time is set.
 
@@ -162,3 +553,12 @@ class DuplaApiBase:
         return get_utc_now() >= self.token_expiration_time - timedelta(
             seconds=self.jwt_token_expiration_overlap
         )
+
+    def _is_token_usable(self) -> bool:
+        """Checks whether the JWT token is present and has not passed its actual expiration time
+        (disregarding the overlap time).
+
+        Returns:
+            True if the JWT token can still be used, False otherwise.
+        """
+        return self._is_token_present() and get_utc_now() < self.token_expiration_time
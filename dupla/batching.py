@@ -0,0 +1,148 @@
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .abstract_payload import _get_alias
+from .endpoint import RESPONSE_T, DuplaAccess
+from .exceptions import DuplaResponseException
+from .payload import BasePayload
+
+logger = logging.getLogger(__file__)
+
+__all__ = ["BatchingClient"]
+
+
+@dataclass
+class _Batch:
+    """The IDs collected for one combined request, and its outcome."""
+
+    payload: BasePayload
+    endpoint: str
+    ids: List[str] = field(default_factory=list)
+    full: threading.Event = field(default_factory=threading.Event)
+    done: threading.Event = field(default_factory=threading.Event)
+    data: Optional[List[RESPONSE_T]] = None
+    error: Optional[BaseException] = None
+
+
+class BatchingClient:
+    """Merges ``get_data`` calls for a few IDs each, made concurrently from many threads, into
+    combined requests for the whole list of IDs. The data is split by ID and returned to each
+    caller, so the callers get the same records as with separate requests.
+
+    Calls are merged when they only differ in the IDs, i.e. with the same payload class,
+    endpoint and other parameters. The first call of a batch waits up to ``max_wait`` seconds
+    for other calls, or until the batch has ``max_batch_size`` IDs, and then sends the request
+    with ``DuplaAccess.get_data``, so chunking, caching and retries apply as usual.
+    If the request fails, the exception is raised in all the calls of the batch.
+    The records must hold the ID, c.f. ``id_keys``: if none of the records of a batch has
+    the ID field, `DuplaResponseException` is raised in all the calls, as the records cannot
+    be split by ID.
+
+    Arguments:
+        api (DuplaAccess): The client sending the combined requests.
+        max_wait (float): The number of seconds a batch waits for more calls.
+            Defaults to 0.01.
+        max_batch_size (int): The maximum number of IDs in a batch. Defaults to 100.
+        id_keys (Optional[Dict[str, str]]): The field of the records holding the ID, per
+            request parameter, e.g. ``{"VirksomhedSENummer": "SENummer"}``. By default the
+            records are assumed to use the name of the request parameter.
+    """
+
+    def __init__(
+        self,
+        api: DuplaAccess,
+        max_wait: float = 0.01,
+        max_batch_size: int = 100,
+        id_keys: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be at least 1, got {max_batch_size}")
+        self.api = api
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self.id_keys = id_keys or {}
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, str], _Batch] = {}
+        self.calls = 0
+        self.requests = 0
+
+    def get_data(self, payload: BasePayload, endpoint: Optional[str] = None) -> List[RESPONSE_T]:
+        """Request the data of a payload as part of a combined request.
+        Payloads without an ID list are requested separately.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                Defaults to None.
+        Returns:
+            List[Dict[str, Any]]: The records of the IDs of the payload.
+        """
+        id_field = payload.get_id_field()
+        if id_field is None:
+            return self.api.get_data(payload, endpoint=endpoint)
+        if endpoint is None:
+            endpoint = self.api.get_endpoint(payload)
+
+        key = _get_alias(id_field)
+        serialized = payload.get_payload()
+        ids: List[str] = serialized.pop(key)
+        group = (endpoint, key, json.dumps(serialized, sort_keys=True))
+
+        with self._lock:
+            self.calls += 1
+            batch = self._pending.get(group)
+            leader = batch is None or len(batch.ids) + len(ids) > self.max_batch_size
+            if leader:
+                if batch is not None:
+                    batch.full.set()
+                batch = _Batch(payload, endpoint)
+                self._pending[group] = batch
+            batch.ids.extend(i for i in ids if i not in batch.ids)
+            if len(batch.ids) >= self.max_batch_size:
+                batch.full.set()
+                del self._pending[group]
+
+        if leader:
+            self._send(group, batch, id_field, key)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return self._select(batch.data, key, ids)
+
+    def _send(self, group: Tuple[str, str, str], batch: _Batch, id_field: str, key: str) -> None:
+        """Wait for the batch to fill up, and send the combined request."""
+        batch.full.wait(self.max_wait)
+        with self._lock:
+            if self._pending.get(group) is batch:
+                del self._pending[group]
+            self.requests += 1
+        try:
+            combined = batch.payload.with_ids(**{id_field: batch.ids})
+            data = self.api.get_data(combined, endpoint=batch.endpoint)
+            record_key = self.id_keys.get(key, key)
+            if data and not any(record_key in record for record in data):
+                raise DuplaResponseException(
+                    f"None of the records have the ID field {record_key}, set it in id_keys"
+                )
+            batch.data = data
+        except BaseException as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+    def _select(self, data: List[RESPONSE_T], key: str, ids: List[str]) -> List[RESPONSE_T]:
+        """Get the records of the IDs from the data of the batch."""
+        record_key = self.id_keys.get(key, key)
+        wanted = set(ids)
+        selected = []
+        for record in data:
+            if record_key not in record:
+                logger.warning("Dropping a record without the ID field %s", record_key)
+            elif str(record[record_key]) in wanted:
+                selected.append(record)
+        return selected
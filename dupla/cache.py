@@ -0,0 +1,325 @@
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .json_backend import get_json_loads
+
+__all__ = [
+    "CacheStats",
+    "ResponseCache",
+    "MemoryResponseCache",
+    "SQLiteResponseCache",
+    "cache_key",
+]
+
+RESPONSE_T = Dict[str, Any]
+
+# The fastest JSON decoder installed
+_loads = get_json_loads()
+
+
+def _canonical(value: Any) -> Any:
+    """Sort lists of scalars (e.g. ID lists), as the order of the filters does not matter."""
+    if isinstance(value, list) and all(isinstance(v, (str, int, float)) for v in value):
+        return sorted(value, key=lambda v: (type(v).__name__, v))
+    return value
+
+
+def cache_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """Build the cache key of a request from the endpoint and the serialized payload,
+    c.f. `BasePayload.get_payload`. The key does not depend on the order of the keys
+    or of the ID lists.
+
+    Args:
+        endpoint (str): The endpoint URL.
+        payload (Dict[str, Any]): The payload in a json-able format.
+
+    Returns:
+        str: The hex encoded SHA-256 hash.
+    """
+    canonical = {key: _canonical(val) for key, val in payload.items()}
+    content = json.dumps([endpoint, canonical], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _encode(data: List[RESPONSE_T]) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _decode(content: bytes) -> List[RESPONSE_T]:
+    return _loads(content)
+
+
+@dataclass
+class CacheStats:
+    """Counters of a response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
+class ResponseCache(abc.ABC):
+    """Interface for a cache of the data returned for a request.
+
+    Arguments:
+        default_ttl (float): The number of seconds an entry is valid, unless the payload
+            class sets ``cache_ttl``. Defaults to 300.
+    """
+
+    def __init__(self, default_ttl: float = 300) -> None:
+        self.default_ttl = default_ttl
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[List[RESPONSE_T]]:
+        """Get the data cached under the key. Returns None if the key is missing or expired."""
+
+    @abc.abstractmethod
+    def set(self, key: str, data: List[RESPONSE_T], ttl: Optional[float] = None) -> None:
+        """Cache the data under the key for ``ttl`` seconds (defaults to ``default_ttl``)."""
+
+    @property
+    @abc.abstractmethod
+    def stats(self) -> CacheStats:
+        """A snapshot of the cache counters."""
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-memory response cache with a time to live, and least recently used eviction when
+    the cache exceeds ``max_bytes``. The data is kept serialized, so every hit returns a new
+    copy of the data, and the size is the number of bytes kept.
+
+    Arguments:
+        max_bytes (int): The maximum total size of the cached data. Defaults to 64 MB.
+        default_ttl (float): The number of seconds an entry is valid, unless the payload
+            class sets ``cache_ttl``. Defaults to 300.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300) -> None:
+        super().__init__(default_ttl=default_ttl)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[List[RESPONSE_T]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+        return _decode(entry[1])
+
+    def set(self, key: str, data: List[RESPONSE_T], ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        content = _encode(data)
+        if ttl <= 0 or len(content) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, content)
+            self._stats.entries += 1
+            self._stats.size_bytes += len(content)
+            while self._stats.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all entries. The hit and miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.entries = 0
+            self._stats.size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry. Must be called while holding the lock."""
+        _, content = self._entries.pop(key)
+        self._stats.entries -= 1
+        self._stats.size_bytes -= len(content)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+
+# The number of entries removed per query when the SQLite cache is over its size
+_EVICTION_BATCH = 64
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Persistent response cache in an SQLite database, e.g. for reruns of failed jobs, where
+    only the requests missing from the cache are sent. The data is compressed with zlib.
+
+    The database may be shared by several threads and processes. Entries expire after their
+    time to live, and the least recently used entries are evicted when the total compressed
+    size exceeds ``max_bytes``. The hit, miss and eviction counters are kept per instance.
+
+    Arguments:
+        path (str): Path to the database file. Created if it does not exist.
+        max_bytes (int): The maximum total size of the compressed data. Defaults to 1 GB.
+        default_ttl (float): The number of seconds an entry is valid, unless the payload
+            class sets ``cache_ttl``. Defaults to 24 hours.
+        compression_level (int): The zlib compression level. Defaults to 6.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        default_ttl: float = 24 * 60 * 60,
+        compression_level: int = 6,
+    ) -> None:
+        super().__init__(default_ttl=default_ttl)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL, "
+                "size INTEGER, content BLOB)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)"
+            )
+            # The total size is kept up to date by triggers, so the writes don't sum the table
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS total_size (id INTEGER PRIMARY KEY, size INTEGER)"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO total_size "
+                "SELECT 0, COALESCE(SUM(size), 0) FROM responses"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses "
+                "BEGIN UPDATE total_size SET size = size + NEW.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses "
+                "BEGIN UPDATE total_size SET size = size + NEW.size - OLD.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses "
+                "BEGIN UPDATE total_size SET size = size - OLD.size; END"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """The connection of the current thread, as connections may not be shared."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[List[RESPONSE_T]]:
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT content FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self._stats.misses += 1
+                return None
+            self._stats.hits += 1
+        return _decode(zlib.decompress(row[0]))
+
+    def set(self, key: str, data: List[RESPONSE_T], ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        content = zlib.compress(_encode(data), self.compression_level)
+        if len(content) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connection() as connection:
+            # An upsert rather than a replace, as a replace does not run the delete trigger
+            connection.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at, "
+                "size = excluded.size, content = excluded.content",
+                (key, now + ttl, now, len(content), sqlite3.Binary(content)),
+            )
+            evicted = self._evict(connection, now)
+        if evicted:
+            with self._lock:
+                self._stats.evictions += evicted
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> int:
+        """Remove expired entries, and the least recently used entries beyond ``max_bytes``.
+        Returns the number of unexpired entries evicted."""
+        connection.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (size,) = connection.execute("SELECT size FROM total_size").fetchone()
+        evicted = 0
+        while size > self.max_bytes:
+            # The least recently used entries, in small batches read from the index
+            rows = connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?",
+                (_EVICTION_BATCH,),
+            ).fetchall()
+            if not rows:
+                break
+            for key, entry_size in rows:
+                if size <= self.max_bytes:
+                    break
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                size -= entry_size
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        """Remove all entries. The hit and miss counters are kept."""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Close the database connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._connection() as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE expires_at > ?",
+                (time.time(),),
+            ).fetchone()
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=entries,
+                size_bytes=size,
+            )
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from .exceptions import DuplaCircuitOpenException
+
+__all__ = ["CircuitBreaker"]
+
+logger = logging.getLogger(__file__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def circuit_key(endpoint: str) -> str:
+    """The key of an endpoint URL in a `CircuitBreaker`: its path, e.g. ``/Momsangivelse``."""
+    return urlsplit(endpoint).path
+
+
+def is_failure(response: requests.Response) -> bool:
+    """Whether a response shows that the service is failing (HTTP 5xx). Other errors, e.g.
+    HTTP 429 or an invalid payload, say nothing about the health of the service."""
+    return response.status_code >= 500
+
+
+class _Circuit:
+    """The state of one key. Only used while holding the lock of the breaker."""
+
+    __slots__ = ("state", "outcomes", "opened_at", "trials", "trial_successes")
+
+    def __init__(self, window_size: int) -> None:
+        self.state = CLOSED
+        # True for a failed request, for the last ``window_size`` requests
+        self.outcomes: Deque[bool] = deque(maxlen=window_size)
+        self.opened_at = 0.0
+        self.trials = 0
+        self.trial_successes = 0
+
+
+class CircuitBreaker:
+    """Stops sending requests to a service which is failing, so the requests fail fast
+    instead of each using all its retries, and the workers stay free for other services.
+    Each key (the path of an endpoint, c.f. ``BasePayload.default_endpoint``) has its own
+    circuit, and the breaker is shared by all threads using a client.
+
+    A circuit is closed (requests are sent) until at least ``failure_rate`` of the last
+    ``window_size`` requests failed, counting from ``min_calls`` requests. Network errors and
+    HTTP 5xx are failures. The circuit is then open for ``open_seconds``, where requests raise
+    `DuplaCircuitOpenException` without being sent. After that the circuit is half-open:
+    ``half_open_max_calls`` trial requests are sent, and the circuit closes if all of them
+    succeed, or opens again at the first failure.
+
+    Arguments:
+        failure_rate (float): The fraction of failed requests which opens the circuit.
+            Defaults to 0.5.
+        window_size (int): The number of recent requests the failure rate is computed over.
+            Defaults to 20.
+        min_calls (int): The minimum number of requests in the window before the circuit can
+            open. Defaults to 10.
+        open_seconds (float): The number of seconds the circuit stays open before trial
+            requests are sent. Defaults to 30.
+        half_open_max_calls (int): The number of trial requests. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        if not 0 < failure_rate <= 1:
+            raise ValueError(f"failure_rate must be in the range (0, 1], got {failure_rate}")
+        if not 1 <= min_calls <= window_size:
+            raise ValueError(
+                f"min_calls must be between 1 and window_size ({window_size}), got {min_calls}"
+            )
+        if half_open_max_calls < 1:
+            raise ValueError(f"half_open_max_calls must be at least 1, got {half_open_max_calls}")
+        self.failure_rate = failure_rate
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, key: str) -> _Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window_size)
+        return circuit
+
+    def _update(self, circuit: _Circuit) -> None:
+        """Move an open circuit to half-open when its time is up."""
+        if circuit.state == OPEN and time.monotonic() - circuit.opened_at >= self.open_seconds:
+            circuit.state = HALF_OPEN
+            circuit.trials = 0
+            circuit.trial_successes = 0
+
+    def _open(self, key: str, circuit: _Circuit) -> None:
+        logger.warning("Opening the circuit of %s for %s seconds", key, self.open_seconds)
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+        circuit.outcomes.clear()
+
+    def state(self, key: str) -> str:
+        """The state of the circuit of the key: ``"closed"``, ``"open"`` or ``"half_open"``."""
+        with self._lock:
+            circuit = self._circuit(key)
+            self._update(circuit)
+            return circuit.state
+
+    def acquire(self, key: str) -> None:
+        """Check that a request for the key may be sent. Every successful `acquire` must be
+        followed by a `release`.
+
+        Raises:
+            DuplaCircuitOpenException: If the circuit is open, or half-open with all trial
+                requests in flight.
+        """
+        with self._lock:
+            circuit = self._circuit(key)
+            self._update(circuit)
+            if circuit.state == CLOSED:
+                return
+            if circuit.state == HALF_OPEN and circuit.trials < self.half_open_max_calls:
+                circuit.trials += 1
+                return
+            state = circuit.state
+            retry_after = max(circuit.opened_at + self.open_seconds - time.monotonic(), 0.0)
+        raise DuplaCircuitOpenException(
+            f"The circuit of {key} is {state}, the service is failing",
+            endpoint=key,
+            retry_after=retry_after,
+        )
+
+    def release(self, key: str, failed: Optional[bool]) -> None:
+        """Record the outcome of a request for the key.
+
+        Args:
+            key (str): The key.
+            failed (Optional[bool]): Whether the request failed. None if the outcome says
+                nothing about the service, e.g. the request was never sent.
+        """
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state == HALF_OPEN:
+                if failed:
+                    self._open(key, circuit)
+                elif failed is None:
+                    # Let another request take the trial
+                    circuit.trials = max(circuit.trials - 1, 0)
+                else:
+                    circuit.trial_successes += 1
+                    if circuit.trial_successes >= self.half_open_max_calls:
+                        logger.info("Closing the circuit of %s", key)
+                        circuit.state = CLOSED
+                return
+            if circuit.state == OPEN or failed is None:
+                # A request sent before the circuit opened
+                return
+            circuit.outcomes.append(failed)
+            if len(circuit.outcomes) >= self.min_calls and sum(
+                circuit.outcomes
+            ) >= self.failure_rate * len(circuit.outcomes):
+                self._open(key, circuit)
+
+    def call(self, key: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """Send a request through the circuit of the key.
+
+        Args:
+            key (str): The key, c.f. `circuit_key`.
+            send (Callable[[], requests.Response]): Sends the request.
+
+        Raises:
+            DuplaCircuitOpenException: If the circuit does not allow the request.
+
+        Returns:
+            requests.Response: The response.
+        """
+        self.acquire(key)
+        failed = None
+        try:
+            response = send()
+            failed = is_failure(response)
+            return response
+        except requests.exceptions.RequestException:
+            failed = True
+            raise
+        finally:
+            self.release(key, failed)
@@ -0,0 +1,257 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union, overload
+
+__all__ = ["ColumnarResult"]
+
+RESPONSE_T = Dict[str, Any]
+
+# The state of a value in a column
+_MISSING = 0  # The record does not have the key
+_NULL = 1  # The value is None
+_PRESENT = 2
+
+# The array type codes of the typed columns
+_TYPECODES = {bool: "b", int: "q", float: "d"}
+
+# String columns with more distinct values than this are stored as text, not as codes
+_MAX_CATEGORIES = 1024
+
+
+class _Column:
+    """The values of one key of the records. Booleans, integers and floats are kept in typed
+    arrays. Strings are kept as indices into a list of the distinct strings, so repeated
+    values (e.g. codes) are only stored once, and columns with many distinct strings (e.g.
+    IDs) as one UTF-8 buffer with offsets. Columns with other or mixed types are lists."""
+
+    __slots__ = ("kind", "values", "states", "strings", "lookup", "text")
+
+    def __init__(self, length: int = 0) -> None:
+        # One of None (no values yet), bool, int, float, str (codes), bytes (text) or object
+        self.kind: Optional[type] = None
+        self.values: Union[array, List[Any]] = [None] * length
+        self.states = bytearray(length)
+        self.strings: List[str] = []
+        self.lookup: Dict[str, int] = {}
+        self.text = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def append(self, value: Any, state: int = _PRESENT) -> None:
+        if state == _PRESENT and value is None:
+            state = _NULL
+        value_type = type(value)
+        if state == _PRESENT and value_type is not self.kind and self.kind is not object:
+            if self.kind is None and value_type in (*_TYPECODES, str):
+                self._set_kind(value_type)
+            elif not (self.kind is bytes and value_type is str):
+                self._set_kind(object)
+
+        if state != _PRESENT:
+            self._append_empty()
+        elif self.kind is str:
+            code = self.lookup.get(value)
+            if code is None:
+                if len(self.strings) == _MAX_CATEGORIES:
+                    self._set_kind(bytes)
+                    return self.append(value, state)
+                code = self.lookup[value] = len(self.strings)
+                self.strings.append(value)
+            self.values.append(code)
+        elif self.kind is bytes:
+            self.text += value.encode()
+            self.values.append(len(self.text))
+        else:
+            try:
+                self.values.append(value)
+            except OverflowError:
+                # An integer beyond 64 bits
+                self._set_kind(object)
+                self.values.append(value)
+        self.states.append(state)
+
+    def _append_empty(self) -> None:
+        if self.kind in (None, object):
+            self.values.append(None)
+        elif self.kind is bytes:
+            self.values.append(len(self.text))
+        else:
+            self.values.append(0)
+
+    def _set_kind(self, kind: type) -> None:
+        """Convert the column to another type."""
+        if kind is object:
+            values = [self[i] for i in range(len(self))]
+        elif kind is bytes:
+            text = bytearray()
+            values = array("Q")
+            for i in range(len(self)):
+                text += (self[i] or "").encode()
+                values.append(len(text))
+            self.text = text
+            self.strings, self.lookup = [], {}
+        else:
+            typecode = "I" if kind is str else _TYPECODES[kind]
+            values = array(typecode, bytes(array(typecode).itemsize * len(self)))
+        self.values = values
+        self.kind = kind
+
+    def has(self, index: int) -> bool:
+        return self.states[index] != _MISSING
+
+    def __getitem__(self, index: int) -> Any:
+        if self.states[index] != _PRESENT:
+            return None
+        if self.kind is str:
+            return self.strings[self.values[index]]
+        if self.kind is bytes:
+            # The values are the end offsets of the strings
+            start = self.values[index - 1] if index else 0
+            return self.text[start : self.values[index]].decode()
+        if self.kind is bool:
+            return bool(self.values[index])
+        return self.values[index]
+
+    def slice(self, indices: slice) -> "_Column":
+        column = _Column()
+        if self.kind is bytes:
+            # The offsets are not contiguous in a slice, so the text is rebuilt
+            for i in range(*indices.indices(len(self))):
+                column.append(self[i], self.states[i])
+            return column
+        column.kind = self.kind
+        column.values = self.values[indices]
+        column.states = self.states[indices]
+        if self.kind is str:
+            # Appending to the slice must not change this column
+            column.strings = list(self.strings)
+            column.lookup = dict(self.lookup)
+        return column
+
+    def nbytes(self) -> int:
+        """Approximate memory use of the column, not counting the objects of object columns."""
+        size = sys.getsizeof(self.values) + sys.getsizeof(self.states)
+        size += sys.getsizeof(self.text)
+        if self.kind is str:
+            size += sys.getsizeof(self.strings) + sys.getsizeof(self.lookup)
+            size += sum(sys.getsizeof(s) for s in self.strings)
+        return size
+
+
+class ColumnarResult:
+    """A compact container of records, which keeps the values column-wise, c.f.
+    `DuplaAccess.get_data_columnar`. Booleans, integers and floats are kept in typed arrays,
+    and strings are stored once per distinct value, so the memory use is a fraction of the
+    list of dicts returned by ``get_data``.
+
+    The records are converted to dicts when accessed::
+
+        result = ColumnarResult.from_records(data)
+        result[0]  # The first record as a dict
+        result[10:20]  # A ColumnarResult of records 10 to 19
+        result["SagTypeKode"]  # The values of a key, None where missing
+        result.to_dicts()  # All records as dicts
+
+    Records keep their keys, except that the keys of a record are ordered by their first
+    appearance in the result. Records without a key do not get the key when converted.
+    """
+
+    def __init__(self) -> None:
+        self._columns: Dict[str, _Column] = {}
+        self._length = 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[RESPONSE_T]) -> "ColumnarResult":
+        """Build the container from records, e.g. from `DuplaAccess.iter_data`."""
+        result = cls()
+        result.extend(records)
+        return result
+
+    def append(self, record: RESPONSE_T) -> None:
+        """Add a record at the end."""
+        for name in record:
+            if name not in self._columns:
+                self._columns[name] = _Column(self._length)
+        for name, column in self._columns.items():
+            if name in record:
+                column.append(record[name])
+            else:
+                column.append(None, _MISSING)
+        self._length += 1
+
+    def extend(self, records: Iterable[RESPONSE_T]) -> None:
+        """Add records at the end."""
+        for record in records:
+            self.append(record)
+
+    @property
+    def columns(self) -> List[str]:
+        """The keys of the records."""
+        return list(self._columns)
+
+    def column(self, name: str) -> List[Any]:
+        """The values of a key for all records, None where the record does not have the key."""
+        column = self._columns[name]
+        return [column[i] for i in range(self._length)]
+
+    def record(self, index: int) -> RESPONSE_T:
+        """Get a record as a dict."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record index out of range")
+        return {name: col[index] for name, col in self._columns.items() if col.has(index)}
+
+    def to_dicts(self) -> List[RESPONSE_T]:
+        """Get all records as dicts."""
+        return list(self)
+
+    def nbytes(self) -> int:
+        """Approximate memory use of the container."""
+        return sys.getsizeof(self._columns) + sum(c.nbytes() for c in self._columns.values())
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[RESPONSE_T]:
+        for index in range(self._length):
+            yield self.record(index)
+
+    @overload
+    def __getitem__(self, key: int) -> RESPONSE_T:
+        ...
+
+    @overload
+    def __getitem__(self, key: slice) -> "ColumnarResult":
+        ...
+
+    @overload
+    def __getitem__(self, key: str) -> List[Any]:
+        ...
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, slice):
+            result = ColumnarResult()
+            result._length = len(range(*key.indices(self._length)))
+            result._columns = {name: col.slice(key) for name, col in self._columns.items()}
+            # Drop the keys which none of the records in the slice have
+            result._columns = {
+                name: col
+                for name, col in result._columns.items()
+                if any(state != _MISSING for state in col.states)
+            }
+            return result
+        return self.record(key)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ColumnarResult):
+            return self.to_dicts() == other.to_dicts()
+        if isinstance(other, list):
+            return self.to_dicts() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult({self._length} records, columns={self.columns})"
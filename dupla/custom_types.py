@@ -1,7 +1,11 @@
+from collections.abc import Iterable, Mapping
 from typing import Annotated, Any, Callable, List
 
 from pydantic import AfterValidator, BeforeValidator
 
+# The number of invalid IDs included in the error message
+_MAX_REPORTED = 20
+
 
 def _string_num_len_n(n: int) -> Callable[[str], str]:
     """Helper function to validate the correctness
@@ -26,10 +30,97 @@ def _stringify_int(val: Any) -> Any:
     return val
 
 
+def _stringify(val: Any) -> Any:
+    """Integers and bytes are valid IDs, they just need to be strings"""
+    if isinstance(val, int):
+        return str(val)
+    if isinstance(val, (bytes, bytearray)):
+        return val.decode()
+    return val
+
+
+def _all_digits(values: List[Any], n: int) -> bool:
+    """Return True if all values are strings of ``n`` ASCII digits.
+    The check is done on the joined string, without a Python loop over the values."""
+    try:
+        joined = ",".join(values)
+    except TypeError:
+        return False
+    separators = "," * (len(values) - 1)
+    return (
+        len(joined) == len(values) * (n + 1) - 1
+        and joined.isascii()
+        # Every (n+1)th character is a separator, and all other characters are digits
+        and joined[n :: n + 1] == separators
+        and joined.encode().translate(None, b"0123456789") == separators.encode()
+    )
+
+
+def validate_ids(values: List[Any], n: int, deduplicate: bool = False) -> List[str]:
+    """Validate a list of IDs of ``n`` digits in one pass, c.f. `CVR_T`, `SE_T` and `CPR_T`.
+    Integers and bytes are converted to strings. The common case of a list of digit strings is
+    checked on the concatenation of the IDs, and the IDs are only checked one by one if that
+    fails, to report all invalid IDs with their positions.
+
+    Args:
+        values (List[Any]): The IDs.
+        n (int): The number of digits of the IDs.
+        deduplicate (bool): Remove repeated IDs, keeping the first occurrence.
+            Defaults to False.
+
+    Raises:
+        ValueError: With the position and the error of every invalid ID.
+        TypeError: If an ID is neither a string nor an integer.
+
+    Returns:
+        List[str]: The IDs.
+    """
+    if not _all_digits(values, n):
+        values = [_stringify(v) for v in values]
+        for index, value in enumerate(values):
+            if not isinstance(value, str):
+                raise TypeError(f"IDs must be strings or integers, got {value!r} at index {index}")
+        # The per-ID checks accept a few more forms, e.g. with a sign, c.f. _string_num_len_n
+        validator = _string_num_len_n(n)
+        errors = []
+        for index, value in enumerate(values):
+            try:
+                validator(value)
+            except ValueError as e:
+                errors.append(f"{index}: {e}")
+        if errors:
+            shown = "; ".join(errors[:_MAX_REPORTED])
+            more = (
+                f" (and {len(errors) - _MAX_REPORTED} more)" if len(errors) > _MAX_REPORTED else ""
+            )
+            raise ValueError(f"{len(errors)} invalid IDs: {shown}{more}")
+    if deduplicate:
+        return list(dict.fromkeys(values))
+    return list(values)
+
+
+def _bulk_ids(n: int) -> Callable[[Any], Any]:
+    """Validate a whole list of IDs at once, c.f. `validate_ids`. Any other iterable of IDs,
+    e.g. a set or a generator, is converted to a list first. Other input is left for Pydantic
+    to reject."""
+
+    def _inner(values: Any) -> Any:
+        if isinstance(values, (str, bytes, bytearray, Mapping)) or not isinstance(values, Iterable):
+            return values
+        values = list(values)
+        try:
+            return validate_ids(values, n)
+        except TypeError:
+            return values
+
+    return _inner
+
+
 CVR_STR = Annotated[str, BeforeValidator(_stringify_int), AfterValidator(_string_num_len_n(8))]
 SE_STR = Annotated[str, BeforeValidator(_stringify_int), AfterValidator(_string_num_len_n(8))]
 CPR_STR = Annotated[str, BeforeValidator(_stringify_int), AfterValidator(_string_num_len_n(10))]
 
-CVR_T = List[CVR_STR]
-CPR_T = List[CPR_STR]
-SE_T = List[SE_STR]
+# The lists are validated in bulk, and the elements only checked to be strings
+CVR_T = Annotated[List[str], BeforeValidator(_bulk_ids(8))]
+CPR_T = Annotated[List[str], BeforeValidator(_bulk_ids(10))]
+SE_T = Annotated[List[str], BeforeValidator(_bulk_ids(8))]
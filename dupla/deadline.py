@@ -0,0 +1,96 @@
+import contextlib
+import contextvars
+import time
+from typing import Callable, Iterator, Optional, Tuple, TypeVar, Union
+
+from .exceptions import DuplaDeadlineExceeded
+
+__all__ = ["Deadline", "current_deadline", "deadline_scope"]
+
+T = TypeVar("T")
+
+# A timeout in seconds, or a (connect, read) tuple of timeouts, as taken by `requests`
+TIMEOUT_T = Union[float, Tuple[float, float]]
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar(
+    "dupla_deadline", default=None
+)
+
+
+class Deadline:
+    """The point in time by which a call must be done.
+
+    Arguments:
+        seconds (float): The number of seconds from now.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        if seconds <= 0:
+            raise ValueError(f"The deadline must be positive, got {seconds}")
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """The number of seconds left, 0 if the deadline has passed."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self) -> None:
+        """Raise `DuplaDeadlineExceeded` if the deadline has passed."""
+        if self.expired():
+            raise DuplaDeadlineExceeded(f"The deadline of {self.seconds} seconds was exceeded")
+
+    def timeout(self, timeout: Optional[TIMEOUT_T]) -> Tuple[float, float]:
+        """The (connect, read) timeout of the next request, capped by the time left.
+
+        Raises:
+            DuplaDeadlineExceeded: If the deadline has passed.
+        """
+        self.check()
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining, remaining
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        return min(timeout[0], remaining), min(timeout[1], remaining)
+
+    def __repr__(self) -> str:
+        return f"Deadline({self.seconds}, remaining={self.remaining():.3f})"
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the current call, c.f. `deadline_scope`."""
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Set the deadline of the requests, retries and token refreshes in the block.
+    A nested scope can shorten the deadline, but never extend it. Does nothing if
+    ``seconds`` is None."""
+    outer = _current_deadline.get()
+    if seconds is None:
+        yield outer
+        return
+    deadline = Deadline(seconds)
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def in_current_context(func: Callable[..., T]) -> Callable[..., T]:
+    """Wrap a function to run in a copy of the current context, e.g. in another thread,
+    so it keeps the deadline of the caller."""
+    context = contextvars.copy_context()
+
+    def _run(*args, **kwargs) -> T:
+        # A context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+
+    return _run
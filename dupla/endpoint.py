@@ -1,25 +1,200 @@
+import contextlib
+import contextvars
+import json
 import logging
-from typing import Any, Dict, List, Optional
+from collections import Counter
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
-import backoff
 import requests
+from pydantic import BaseModel, ValidationError
 
-from dupla.retry import parse_header_retry_after, stop_retry_on_err
+from dupla.retry import (
+    RetryPolicy,
+    RetryStats,
+    is_bisectable_error,
+    parse_header_retry_after,
+    timeout_retries,
+)
 
-from .base import DuplaApiBase
+from ._singleflight import SingleFlight
+from .abstract_payload import DATE_WINDOW_T, _get_alias
+from .base import DEFAULT_TIMEOUT, DuplaApiBase
+from .cache import ResponseCache, cache_key
+from .circuit_breaker import CircuitBreaker, circuit_key
+from .columnar import ColumnarResult
+from .deadline import TIMEOUT_T, current_deadline, deadline_scope, in_current_context
 from .exceptions import DuplaApiException, DuplaResponseException
+from .json_backend import LOADS_T, get_json_loads
 from .payload import BasePayload
+from .ratelimit import RateLimiter
+from .response import parse_records
+from .streaming import NotAListError, iter_json_array
+from .token_store import TokenStore
 
 logger = logging.getLogger(__file__)
 
-__all__ = ["DuplaAccess"]
+__all__ = ["DuplaAccess", "BulkResult", "PartialResult"]
 
 RESPONSE_T = Dict[str, Any]
 
+# Set in the workers of `DuplaAccess.get_data_many`, where the chunks of a payload are
+# requested one after the other, so the number of requests in flight is ``max_workers``
+_sequential_chunks: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "dupla_sequential_chunks", default=False
+)
+
+# Bytes read at a time from streamed responses
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _parse_response_data(response: Any, loads: LOADS_T = json.loads) -> List[RESPONSE_T]:
+    """Get the ``data`` list of a DUPLA response, decoding the body with ``loads``.
+    Works with any response object with ``content``, e.g. from ``httpx``."""
+    try:
+        response_json: Dict[str, Any] = loads(response.content)
+
+        # Perform simple type check to fail fast if the server has returned
+        # something unknown.
+        data = response_json["data"]
+        if not isinstance(data, list):
+            logger.exception(
+                "Received an invalid response from DUPLA, which was not a list: %s", data
+            )
+            raise DuplaResponseException(
+                "Invalid response from DUPLA. The data key did not contain a list.",
+                response=response,
+            )
+        return data
+    except DuplaResponseException as e:
+        # Let the inner exception through
+        raise e
+    except Exception as e:
+        logger.exception("Error occurred while processing response: %s", response.content)
+        raise DuplaResponseException(
+            "An error occurred while parsing the DUPLA response.",
+            response=response,
+        ) from e
+
+
+def _iter_response_data(response: requests.Response) -> Iterator[RESPONSE_T]:
+    """Yield the records of the ``data`` list of a streamed DUPLA response,
+    c.f. `_parse_response_data`."""
+    try:
+        yield from iter_json_array(response.iter_content(chunk_size=_STREAM_CHUNK_SIZE))
+    except NotAListError as e:
+        logger.exception("Received an invalid response from DUPLA, which was not a list: %s", e)
+        raise DuplaResponseException(
+            "Invalid response from DUPLA. The data key did not contain a list.",
+            response=response,
+        ) from e
+    except (ValueError, requests.exceptions.RequestException) as e:
+        logger.exception("Error occurred while processing the streamed response: %s", e)
+        raise DuplaResponseException(
+            "An error occurred while parsing the DUPLA response.",
+            response=response,
+        ) from e
+
+
+def _record_key(value: Any) -> Any:
+    """A hashable key of a JSON record, equal for equal records."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _record_key(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_record_key(v) for v in value)
+    return value
+
+
+def _merge_windows(
+    payload: BasePayload, chunks: List[Dict[str, Any]], parts: List[List[RESPONSE_T]]
+) -> List[RESPONSE_T]:
+    """Concatenate the data of the chunks of a payload split in date windows, c.f.
+    `BasePayload.get_payload_chunks`. A record returned for both a window and the previous
+    window, i.e. at the boundary between them, is only included once. Records repeated
+    within a window are kept."""
+    from_key, to_key = (_get_alias(name) for name in payload.date_range_fields)
+    windows: List[List[RESPONSE_T]] = []
+    window = None
+    for chunk, part in zip(chunks, parts):
+        if (chunk.get(from_key), chunk.get(to_key)) != window:
+            window = (chunk.get(from_key), chunk.get(to_key))
+            windows.append([])
+        windows[-1].extend(part)
+
+    data: List[RESPONSE_T] = []
+    previous: Counter = Counter()
+    for records in windows:
+        keys = [_record_key(record) for record in records]
+        for record, key in zip(records, keys):
+            if previous[key] > 0:
+                previous[key] -= 1
+            else:
+                data.append(record)
+        previous = Counter(keys)
+    return data
+
+
+@dataclass
+class BulkResult:
+    """The outcome of one payload in `DuplaAccess.get_data_many`.
+
+    Attributes:
+        index (int): The position of the payload in the input.
+        payload (BasePayload): The requested payload.
+        data (Optional[List[Dict[str, Any]]]): The data returned by the API, if successful.
+        error (Optional[BaseException]): The exception raised for the payload, if it failed.
+            Payloads which were cancelled due to ``cancel_on_error`` have a
+            ``concurrent.futures.CancelledError``.
+    """
+
+    index: int
+    payload: BasePayload
+    data: Optional[List[RESPONSE_T]] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class PartialResult:
+    """The outcome of `DuplaAccess.get_data_partial`.
+
+    Attributes:
+        data (List[Dict[str, Any]]): The data returned by the API for the successful IDs.
+        failed_ids (List[str]): The IDs which could not be requested, in the order of the
+            payload.
+        errors (Dict[str, BaseException]): The exception raised for each failed ID.
+        requests (int): The number of requests made, including the requests of the halves.
+    """
+
+    data: List[RESPONSE_T] = field(default_factory=list)
+    failed_ids: List[str] = field(default_factory=list)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    requests: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed_ids
+
+    def merge(self, other: "PartialResult") -> None:
+        self.data.extend(other.data)
+        self.failed_ids.extend(other.failed_ids)
+        self.errors.update(other.errors)
+        self.requests += other.requests
+
 
 class DuplaAccess(DuplaApiBase):
     """
     Class for accessing the Dataudveklspingsplatformen API (Dupla).
+
+    The client keeps a pool of open connections to the API, and can be used as a
+    context manager to close them when done::
+
+        with DuplaAccess(...) as api:
+            data = api.get_data(payload)
     """
 
     def __init__(
@@ -32,6 +207,19 @@ class DuplaAccess(DuplaApiBase):
         base_url: str = r"https://api.skat.dk",
         jwt_token_expiration_overlap: int = 5,
         max_tries: int = 8,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        background_token_refresh: bool = False,
+        token_refresh_fraction: float = 0.8,
+        token_store: Optional[TokenStore] = None,
+        max_chunk_workers: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        coalesce_requests: bool = False,
+        json_backend: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        timeout: Optional[TIMEOUT_T] = DEFAULT_TIMEOUT,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
         """Instantiates new DUPLA API endpoint client.
         Args:
@@ -46,12 +234,57 @@ class DuplaAccess(DuplaApiBase):
             jwt_token_expiration_overlap (int): The overlap time for token expiration time
                 (in seconds) to avoid situations where token is almost expired during the check
                 and will be rejected in a next request. Defaults to 5 seconds.
-            max_tries (int): Maximum number of times a failed request is re-attempted in
-                ``get_data``. Defaults to 8.
+            max_tries (int): Maximum number of attempts of a request, when no
+                ``retry_policy`` is given. Defaults to 8.
+            pool_connections (int): Number of host connection pools kept by the long-lived
+                HTTP session. Defaults to 10.
+            pool_maxsize (int): Maximum number of keep-alive connections kept per host.
+                Should be at least the number of threads sharing the client. Defaults to 10.
+            background_token_refresh (bool): Renew the JWT token in a background thread ahead
+                of its expiration, so ``get_data`` never waits for authentication.
+                Defaults to False.
+            token_refresh_fraction (float): With background refresh, the fraction of the
+                token lifetime after which the token is renewed. Defaults to 0.8.
+            token_store (Optional[TokenStore]): A store for sharing the JWT token between
+                clients and processes using the same certificate, e.g. a
+                ``dupla.token_store.FileTokenStore``. Defaults to None.
+            max_chunk_workers (int): Maximum number of concurrent requests used by ``get_data``
+                when a payload is split into several requests. Not used by ``get_data_many``,
+                which requests the chunks of each payload one after the other. Defaults to 4.
+            rate_limiter (Optional[RateLimiter]): A rate limiter shared by all requests of the
+                client, keyed on the endpoint. Responses with ``Retry-After`` (HTTP 429/503)
+                pause all requests to the endpoint. Defaults to None.
+            response_cache (Optional[ResponseCache]): A cache of the data returned by
+                ``get_data``, e.g. a ``dupla.cache.MemoryResponseCache``. Each request is
+                cached separately, keyed on the endpoint and the payload. Defaults to None.
+            coalesce_requests (bool): Let concurrent ``get_data`` calls of the same endpoint
+                and payload share one request. The calls waiting for another call get a copy
+                of its data, or its exception. Defaults to False.
+            json_backend (Optional[str]): The JSON decoder of the responses, one of
+                ``"orjson"``, ``"msgspec"`` or ``"json"``. Defaults to None, which selects the
+                fastest one installed, c.f. `dupla.json_backend.get_json_loads`.
+            retry_policy (Optional[RetryPolicy]): When and how often failed requests are
+                retried, e.g. with a deadline or a retry budget, and may be shared between
+                clients. Defaults to a ``RetryPolicy(max_tries=max_tries)``.
+            timeout (Optional[Union[float, Tuple[float, float]]]): The (connect, read)
+                timeout in seconds of each request, c.f. `DuplaApiBase`. Defaults to (10, 60).
+            circuit_breaker (Optional[CircuitBreaker]): A circuit breaker keyed on the path of
+                the endpoint, which may be shared with other clients. While the circuit of an
+                endpoint is open, requests to it raise ``DuplaCircuitOpenException`` without
+                being sent or retried. Defaults to None.
         """
 
         self.base_url = base_url
         self.max_tries = max_tries
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_tries)
+        self.max_chunk_workers = max_chunk_workers
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.response_cache = response_cache
+        self._json_loads = get_json_loads(json_backend)
+        self._in_flight: Optional[SingleFlight[List[RESPONSE_T]]] = (
+            SingleFlight() if coalesce_requests else None
+        )
         super().__init__(
             transaction_id,
             agreement_id,
@@ -59,8 +292,19 @@ class DuplaAccess(DuplaApiBase):
             pkcs12_password,
             billetautomat_url,
             jwt_token_expiration_overlap,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            background_token_refresh=background_token_refresh,
+            token_refresh_fraction=token_refresh_fraction,
+            token_store=token_store,
+            timeout=timeout,
         )
 
+    @property
+    def retry_stats(self) -> RetryStats:
+        """The number of calls, attempts and retries of the requests, c.f. `RetryPolicy`."""
+        return self.retry_policy.stats
+
     def get_endpoint(self, payload: BasePayload) -> str:
         """Retrieve the endpoint URL."""
         return payload.__class__.endpoint_from_base_url(self.base_url)
@@ -69,66 +313,314 @@ class DuplaAccess(DuplaApiBase):
         self,
         payload: BasePayload,
         endpoint: Optional[str] = None,
+        date_window: Optional[DATE_WINDOW_T] = None,
+        deadline: Optional[float] = None,
     ) -> List[RESPONSE_T]:
         """Request the server for data.
+        Payloads with long ID lists are split into several requests, which are executed
+        concurrently, c.f. `BasePayload.get_payload_chunks`.
 
         Args:
             payload (BasePayload): The Pydantic payload model.
             endpoint (Optional[str], optional): An optional endpoint URL override.
                 If not provided, it defaults to the url join of the base URL and
                 the payload default URL. Defaults to None.
+            date_window (Optional[Union[timedelta, str]], optional): Split the date range of
+                the payload (c.f. ``BasePayload.date_range_fields``) into windows of this
+                length, e.g. ``"month"`` or ``timedelta(days=7)``, which are requested
+                concurrently. A record returned for two adjacent windows is only included once.
+                Defaults to None.
+            deadline (Optional[float], optional): The maximum number of seconds the call may
+                take, including retries, backoff and token refreshes. The timeout of each
+                request is capped by the time left, and retries which cannot finish in time
+                are not started. Defaults to None (no deadline).
+        Raises:
+            DuplaDeadlineExceeded: If the deadline passes before a request is sent.
         Returns:
             List[Dict[str, Any]]: A JSON list representing data as returned by the API.
         """
         if endpoint is None:
             endpoint = self.get_endpoint(payload)
-        payload_serialized = payload.get_payload()
-        return self._run_payload(payload_serialized, endpoint)
-
-    def _run_payload(self, payload: Dict[str, Any], endpoint: str) -> List[RESPONSE_T]:
-        """Execute a given payload. No conversion is done on the payload."""
+        payloads_serialized = payload.get_payload_chunks(endpoint, date_window=date_window)
+        with deadline_scope(deadline):
+            parts = self._run_payloads(payloads_serialized, endpoint, cache_ttl=payload.cache_ttl)
+        if date_window is not None and len(payloads_serialized) > 1:
+            return _merge_windows(payload, payloads_serialized, parts)
+        return [record for part in parts for record in part]
 
-        # Construct the getter with a backoff, and a modified number of max tries
-        @backoff.on_exception(
-            backoff.expo,
-            (requests.exceptions.RequestException),
-            giveup=lambda e: stop_retry_on_err(e),
-            max_tries=self.max_tries,
-        )
-        @backoff.on_predicate(
-            backoff.runtime,
-            predicate=lambda r: r in (429, 503),
-            value=lambda r: parse_header_retry_after(r.headers),
-            max_tries=self.max_tries,
-            jitter=None,
-        )
-        def _getter():
-            response = self.get(endpoint, params=payload)
-            response.raise_for_status()
+    def _run_payloads(
+        self,
+        payloads: List[Dict[str, Any]],
+        endpoint: str,
+        cache_ttl: Optional[float] = None,
+    ) -> List[List[RESPONSE_T]]:
+        """Execute several payloads concurrently, and return the data of each payload in the
+        order of the payloads. No conversion is done on the payloads."""
+        if len(payloads) == 1 or _sequential_chunks.get():
+            return [self._fetch(p, endpoint, cache_ttl) for p in payloads]
 
+        parts: List[List[RESPONSE_T]] = []
+        # The requests keep the deadline of the call, c.f. `deadline_scope`
+        fetch = in_current_context(self._fetch)
+        with ThreadPoolExecutor(max_workers=self.max_chunk_workers) as executor:
             try:
-                response_json: Dict[str, Any] = response.json()
-
-                # Perform simple type check to fail fast if the server has returned
-                # something unknown.
-                data = response_json["data"]
-                if not isinstance(data, list):
-                    logger.exception(
-                        "Received an invalid response from DUPLA, which was not a list: %s", data
-                    )
-                    raise DuplaResponseException(
-                        "Invalid response from DUPLA. The data key did not contain a list.",
-                        response=response,
-                    )
+                parts.extend(executor.map(lambda p: fetch(p, endpoint, cache_ttl), payloads))
+            except BaseException:
+                # The result is lost anyway, don't start the remaining requests
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+        return parts
+
+    def _fetch(
+        self, payload: Dict[str, Any], endpoint: str, cache_ttl: Optional[float] = None
+    ) -> List[RESPONSE_T]:
+        """Execute a payload, serving it from the response cache if possible, and sharing
+        the request with identical requests in flight if ``coalesce_requests`` is set."""
+        use_cache = self.response_cache is not None and (cache_ttl is None or cache_ttl > 0)
+        if not use_cache and self._in_flight is None:
+            return self._run_payload(payload, endpoint)
+
+        key = cache_key(endpoint, payload)
+        if use_cache:
+            data = self.response_cache.get(key)
+            if data is not None:
                 return data
-            except DuplaResponseException as e:
-                # Let the inner exception through
-                raise e
+
+        def _run() -> List[RESPONSE_T]:
+            data = self._run_payload(payload, endpoint)
+            if use_cache:
+                self.response_cache.set(key, data, ttl=cache_ttl)
+            return data
+
+        if self._in_flight is None:
+            return _run()
+        return self._in_flight.do(key, _run)
+
+    @property
+    def coalesced_requests(self) -> int:
+        """The number of requests which waited for an identical request in flight."""
+        return 0 if self._in_flight is None else self._in_flight.coalesced
+
+    def get_data_partial(
+        self,
+        payload: BasePayload,
+        endpoint: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> PartialResult:
+        """Request the server for data, isolating the IDs which make a request fail.
+        A request with several IDs which fails with a timeout or an HTTP 400, 413, 414 or 422
+        client error (c.f. `dupla.retry.is_bisectable_error`) is split in halves, which are requested
+        again, down to single IDs. The data of the other IDs is returned, along with the
+        failed IDs, so one bad ID does not cost the whole payload.
+
+        A request which fails with another error is not split, and all its IDs are failed.
+        Requests with several IDs are not retried on a timeout, as they are split instead,
+        while single IDs are retried as usual, c.f. `dupla.retry.timeout_retries`.
+        Payloads without an ID list are requested as in ``get_data``.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                Defaults to None.
+            deadline (Optional[float], optional): The maximum number of seconds the call may
+                take, c.f. `get_data`. Defaults to None.
+        Returns:
+            PartialResult: The data, and the failed IDs with their errors.
+        """
+        if endpoint is None:
+            endpoint = self.get_endpoint(payload)
+        id_field = payload.get_id_field()
+        if id_field is None:
+            data = self.get_data(payload, endpoint=endpoint, deadline=deadline)
+            return PartialResult(data=data, requests=1)
+
+        key = _get_alias(id_field)
+
+        def _bisect(chunk: Dict[str, Any]) -> PartialResult:
+            result = PartialResult(requests=1)
+            ids = chunk[key]
+            try:
+                with timeout_retries(len(ids) == 1):
+                    result.data = self._fetch(chunk, endpoint, payload.cache_ttl)
+                return result
             except Exception as e:
-                logger.exception("Error occurred while processing response: %s", response.content)
-                raise DuplaResponseException(
-                    "An error occurred while parsing the DUPLA response.",
-                    response=response,
-                ) from e
+                if len(ids) > 1 and is_bisectable_error(e):
+                    logger.debug("Splitting a request of %d IDs after %r", len(ids), e)
+                    middle = len(ids) // 2
+                    for half in (ids[:middle], ids[middle:]):
+                        result.merge(_bisect({**chunk, key: half}))
+                    return result
+                logger.debug("Request of %d IDs failed: %r", len(ids), e)
+                result.failed_ids = list(ids)
+                result.errors = dict.fromkeys(ids, e)
+                return result
+
+        result = PartialResult()
+        with deadline_scope(deadline):
+            chunks = payload.get_payload_chunks(endpoint)
+            bisect = in_current_context(_bisect)
+            with ThreadPoolExecutor(max_workers=self.max_chunk_workers) as executor:
+                for part in executor.map(bisect, chunks):
+                    result.merge(part)
+        return result
+
+    def get_data_many(
+        self,
+        payloads: Iterable[BasePayload],
+        max_workers: int = 8,
+        ordered: bool = True,
+        cancel_on_error: bool = False,
+    ) -> List[BulkResult]:
+        """Request the server for data for many payloads concurrently.
+        The requests share the pooled session of the client, so ``max_workers`` should not
+        exceed ``pool_maxsize``, or the connections beyond the pool size are not kept alive.
+        Each worker requests the chunks of its payload (c.f. ``get_data``) one after the
+        other instead of using ``max_chunk_workers``, so at most ``max_workers`` requests are
+        in flight.
+
+        Args:
+            payloads (Iterable[BasePayload]): The Pydantic payload models.
+            max_workers (int, optional): Maximum number of requests in flight. Defaults to 8.
+            ordered (bool, optional): Return the results in the order of the input. Otherwise
+                the results are returned in the order they complete. Defaults to True.
+            cancel_on_error (bool, optional): Cancel the payloads which have not yet been
+                started once any payload fails. Defaults to False.
+        Returns:
+            List[BulkResult]: One result per payload, holding either the data or the error.
+        """
+        payloads = list(payloads)
+        results: List[BulkResult] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures: Dict[Future, int] = {
+                executor.submit(self._get_data_sequential, payload): index
+                for index, payload in enumerate(payloads)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = BulkResult(index, payloads[index], data=future.result())
+                except CancelledError as e:
+                    result = BulkResult(index, payloads[index], error=e)
+                except Exception as e:
+                    logger.debug("Payload %d failed: %s", index, e)
+                    result = BulkResult(index, payloads[index], error=e)
+                    if cancel_on_error:
+                        for other in futures:
+                            other.cancel()
+                results.append(result)
+
+        if ordered:
+            results.sort(key=lambda r: r.index)
+        return results
+
+    def _get_data_sequential(self, payload: BasePayload) -> List[RESPONSE_T]:
+        """`get_data`, requesting the chunks of the payload one after the other."""
+        token = _sequential_chunks.set(True)
+        try:
+            return self.get_data(payload)
+        finally:
+            _sequential_chunks.reset(token)
+
+    def iter_data(
+        self, payload: BasePayload, endpoint: Optional[str] = None
+    ) -> Iterator[RESPONSE_T]:
+        """Request the server for data, and yield the records as the response is received.
+        The response body is parsed incrementally, so the memory use does not depend on the
+        size of the response. Payloads with long ID lists are requested one chunk at a time,
+        c.f. `BasePayload.get_payload_chunks`. The response cache is not used.
+
+        Failed requests are retried as in ``get_data`` until the first record is received.
+        An error while reading the response is raised from the iterator, after the records
+        received so far.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                Defaults to None.
+        Yields:
+            Dict[str, Any]: The records of the ``data`` list returned by the API.
+        """
+        if endpoint is None:
+            endpoint = self.get_endpoint(payload)
+        for payload_serialized in payload.get_payload_chunks(endpoint):
+            response = self._request(payload_serialized, endpoint, stream=True)
+            with contextlib.closing(response):
+                yield from _iter_response_data(response)
+
+    def get_models(
+        self,
+        payload: BasePayload,
+        endpoint: Optional[str] = None,
+        date_window: Optional[DATE_WINDOW_T] = None,
+        trusted: bool = False,
+        deadline: Optional[float] = None,
+    ) -> List[BaseModel]:
+        """Request the server for data, and convert the records to the ``response_model`` of
+        the payload class, c.f. `dupla.response.parse_records`.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                Defaults to None.
+            date_window (Optional[Union[timedelta, str]], optional): Split the date range of
+                the payload into windows, c.f. `get_data`. Defaults to None.
+            trusted (bool, optional): Construct the models without validation, for speed.
+                Defaults to False.
+            deadline (Optional[float], optional): The maximum number of seconds the call may
+                take, c.f. `get_data`. Defaults to None.
+        Raises:
+            ValueError: If the payload class has no ``response_model``.
+            DuplaResponseException: If a record does not match the model.
+        Returns:
+            List[BaseModel]: The records as models.
+        """
+        model = payload.response_model
+        if model is None:
+            raise ValueError(f"The payload {type(payload).__name__} has no response model.")
+        data = self.get_data(payload, endpoint=endpoint, date_window=date_window, deadline=deadline)
+        try:
+            return parse_records(model, data, trusted=trusted)
+        except ValidationError as e:
+            raise DuplaResponseException(
+                f"The DUPLA response did not match {model.__name__}: {e}"
+            ) from e
+
+    def get_data_columnar(
+        self, payload: BasePayload, endpoint: Optional[str] = None
+    ) -> ColumnarResult:
+        """Request the server for data, and keep the records in a compact `ColumnarResult`.
+        The records are added as the response is received, c.f. `iter_data`, so the full
+        list of dicts is never held in memory.
+
+        Args:
+            payload (BasePayload): The Pydantic payload model.
+            endpoint (Optional[str], optional): An optional endpoint URL override.
+                Defaults to None.
+        Returns:
+            ColumnarResult: The records of the ``data`` list returned by the API.
+        """
+        return ColumnarResult.from_records(self.iter_data(payload, endpoint=endpoint))
+
+    def _run_payload(self, payload: Dict[str, Any], endpoint: str) -> List[RESPONSE_T]:
+        """Execute a given payload. No conversion is done on the payload."""
+        return _parse_response_data(self._request(payload, endpoint), loads=self._json_loads)
+
+    def _request(
+        self, payload: Dict[str, Any], endpoint: str, stream: bool = False
+    ) -> requests.Response:
+        """Send the request of a payload with retries, c.f. `RetryPolicy`,
+        and return the successful response. Each attempt goes through the circuit breaker."""
+
+        def _send() -> requests.Response:
+            if self.rate_limiter is None:
+                return self.get(endpoint, params=payload, stream=stream)
+            with self.rate_limiter.limit(endpoint, deadline=current_deadline()):
+                response = self.get(endpoint, params=payload, stream=stream)
+            if response.status_code in (429, 503):
+                self.rate_limiter.pause(endpoint, parse_header_retry_after(response.headers))
+            return response
 
-        return _getter()
+        if self.circuit_breaker is None:
+            return self.retry_policy.call(_send)
+        key = circuit_key(endpoint)
+        return self.retry_policy.call(lambda: self.circuit_breaker.call(key, _send))
@@ -1,6 +1,12 @@
 from typing import Any
 
-__all__ = ["DuplaApiException", "DuplaApiAuthenticationException", "InvalidPayloadException"]
+__all__ = [
+    "DuplaApiException",
+    "DuplaApiAuthenticationException",
+    "DuplaCircuitOpenException",
+    "DuplaDeadlineExceeded",
+    "InvalidPayloadException",
+]
 
 
 class DuplaApiException(Exception):
@@ -15,6 +21,19 @@ class DuplaResponseException(DuplaApiException):
         super().__init__(*args)
 
 
+class DuplaDeadlineExceeded(DuplaApiException, TimeoutError):
+    """The deadline of a call passed before it was done."""
+
+
+class DuplaCircuitOpenException(DuplaApiException):
+    """The request was not sent, as the circuit breaker of the endpoint is open."""
+
+    def __init__(self, *args, endpoint: str = "", retry_after: float = 0.0) -> None:
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__(*args)
+
+
 class DuplaApiAuthenticationException(Exception):
     """The authentication to the DUPLA API errored."""
 
@@ -0,0 +1,64 @@
+import json
+from typing import Any, Callable, Dict, Optional
+
+__all__ = ["JSON_BACKENDS", "get_json_loads"]
+
+LOADS_T = Callable[[bytes], Any]
+
+# In the order of preference when no backend is selected
+JSON_BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _orjson_loads() -> LOADS_T:
+    import orjson
+
+    return orjson.loads
+
+
+def _msgspec_loads() -> LOADS_T:
+    import msgspec
+
+    return msgspec.json.Decoder().decode
+
+
+def _json_loads() -> LOADS_T:
+    return json.loads
+
+
+_FACTORIES: Dict[str, Callable[[], LOADS_T]] = {
+    "orjson": _orjson_loads,
+    "msgspec": _msgspec_loads,
+    "json": _json_loads,
+}
+
+
+def get_json_loads(backend: Optional[str] = None) -> LOADS_T:
+    """Get a function decoding JSON directly from bytes.
+
+    Args:
+        backend (Optional[str]): One of ``JSON_BACKENDS``. Defaults to None, which selects the
+            fastest backend installed: ``orjson``, then ``msgspec``, and otherwise the
+            standard library ``json``.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If the selected backend is not installed.
+
+    Returns:
+        Callable[[bytes], Any]: The decoding function.
+    """
+    if backend is None:
+        for name in JSON_BACKENDS:
+            try:
+                return _FACTORIES[name]()
+            except ImportError:
+                continue
+    if backend not in _FACTORIES:
+        raise ValueError(f"Unknown JSON backend {backend!r}, choose one of {JSON_BACKENDS}")
+    try:
+        return _FACTORIES[backend]()
+    except ImportError as e:
+        raise ImportError(
+            f"The JSON backend {backend!r} is not installed, install it with "
+            f"'pip install {backend}'"
+        ) from e
@@ -1,18 +1,24 @@
 from datetime import date
-from typing import ClassVar, List, Optional
+from typing import ClassVar, List, Optional, Tuple, Type
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from .abstract_payload import BasePayload, UdstillingMixin
 from .custom_types import CPR_T, CVR_T, SE_T
+from .response import LigningssagResponse, MomsResponse, PersonResponse, VirksomhedResponse
 
 ENDP_T = ClassVar[str]  # Endpoint type
+DATE_RANGE_T = ClassVar[Optional[Tuple[str, str]]]  # Fields of a splittable date range
+REGISTRERING_RANGE = ("registrering_fra", "registrering_til")
+RESPONSE_MODEL_T = ClassVar[Optional[Type[BaseModel]]]  # Model of the response records
 
 
 class KtrPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Kontrolregistreringer API."""
 
     default_endpoint: ENDP_T = "Kontrolregistreringer/Virksomhed"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
@@ -24,6 +30,8 @@ class KtrObsPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Kontrolobservationer API."""
 
     default_endpoint: ENDP_T = "Kontrolobservationer"
+    response_model: RESPONSE_MODEL_T = PersonResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cpr: CPR_T = Field()
     registrering_fra: Optional[date] = Field(default=None)
@@ -34,6 +42,7 @@ class VirksomhedskontroloplysningerPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Virksomhedskontroloplysninger API."""
 
     default_endpoint: ENDP_T = "virksomhedskontroloplysninger"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
 
     se: SE_T = Field(default=None)
     kontroloplysning_aar: int = Field(default=None)
@@ -43,6 +52,8 @@ class LigPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Ligningssager API."""
 
     default_endpoint: ENDP_T = "Ligningssager"
+    response_model: RESPONSE_MODEL_T = LigningssagResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
@@ -58,6 +69,8 @@ class MomsPayload(UdstillingMixin, BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Momsangivelser API."""
 
     default_endpoint: ENDP_T = "Momsangivelse"
+    response_model: RESPONSE_MODEL_T = MomsResponse
+    date_range_fields: DATE_RANGE_T = ("afregning_start", "afregning_slut")
     se: SE_T = Field()
     afregning_start: date = Field()
     afregning_slut: date = Field()
@@ -67,6 +80,8 @@ class LonsumPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Lønsumsangivelser API."""
 
     default_endpoint: ENDP_T = "Lønsumsangivelser"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
     se: SE_T = Field()
 
     registrering_fra: Optional[date] = Field(default=None)
@@ -80,6 +95,7 @@ class PersonkontroloplysningerPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Personkontroloplysninger API."""
 
     default_endpoint: ENDP_T = "personkontroloplysninger"
+    response_model: RESPONSE_MODEL_T = PersonResponse
 
     cpr: CPR_T = Field(default=None)
     kontroloplysning_aar: int = Field(default=None)
@@ -89,6 +105,8 @@ class SelskabSambeskatningPayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Selskabsambeskatningskreds API."""
 
     default_endpoint: ENDP_T = "Selskabsskatteoplysninger/Selskabsambeskatningskreds"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
 
@@ -101,6 +119,8 @@ class SelskabSelvangivelsePayload(BasePayload):
     """An API client for Dataudstillingsplatformens (DUPLA) Selskabselvangivelse API."""
 
     default_endpoint: ENDP_T = "Selskabsskatteoplysninger/Selskabselvangivelse"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
@@ -114,6 +134,8 @@ class VirksomhedspligterPayload(BasePayload):
     """A payload for accessing DUPLA Virksomhedspligter."""
 
     default_endpoint: ENDP_T = "Virksomhedspligter"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
@@ -131,6 +153,8 @@ class VirksomhedsstatusPayload(BasePayload):
     """A payload for accessing DUPLA Virksomhedsstatus."""
 
     default_endpoint: ENDP_T = "Virksomhedsstatus"
+    response_model: RESPONSE_MODEL_T = VirksomhedResponse
+    date_range_fields: DATE_RANGE_T = REGISTRERING_RANGE
 
     cvr: Optional[CVR_T] = Field(default=None)
     se: Optional[SE_T] = Field(default=None)
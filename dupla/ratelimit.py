@@ -0,0 +1,278 @@
+import abc
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from ._filelock import FileLock, atomic_write
+from .deadline import Deadline
+from .exceptions import DuplaDeadlineExceeded
+
+__all__ = ["RateLimiter", "RateLimitBackend", "MemoryRateLimitBackend", "FileRateLimitBackend"]
+
+
+@dataclass
+class _Bucket:
+    """Token bucket state. ``updated`` may lie in the future while the bucket is paused."""
+
+    tokens: float
+    updated: float
+    paused_until: float = 0.0
+
+    def reserve(self, now: float, requests_per_second: float, burst: int) -> float:
+        """Take a token from the bucket, and return the number of seconds to wait."""
+        if now > self.updated:
+            elapsed = now - self.updated
+            self.tokens = min(burst, self.tokens + elapsed * requests_per_second)
+            self.updated = now
+        self.tokens -= 1
+        # Time until the bucket is no longer paused, plus time to pay back a deficit
+        return (self.updated - now) + max(0.0, -self.tokens) / requests_per_second
+
+    def cancel(self, burst: int) -> None:
+        """Give back the token of a reservation which is not used."""
+        self.tokens = min(burst, self.tokens + 1)
+
+    def pause(self, now: float, seconds: float) -> None:
+        """Hold the bucket for a number of seconds, and restart it empty."""
+        paused_until = now + max(seconds, 0.0)
+        self.paused_until = max(self.paused_until, paused_until)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, paused_until)
+
+
+class RateLimitBackend(abc.ABC):
+    """Interface for the storage of the token buckets of a `RateLimiter`.
+    The backend decides which clients share the limits."""
+
+    @abc.abstractmethod
+    def reserve(self, key: str, requests_per_second: float, burst: int) -> float:
+        """Reserve a request for the key, and return the number of seconds to wait."""
+
+    @abc.abstractmethod
+    def cancel(self, key: str, burst: int) -> None:
+        """Give back a reservation for the key, for a request which is not sent."""
+
+    @abc.abstractmethod
+    def pause(self, key: str, seconds: float) -> None:
+        """Hold all requests for the key for a number of seconds."""
+
+    @abc.abstractmethod
+    def pause_remaining(self, key: str) -> float:
+        """The number of seconds the key is still paused."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Keeps the token buckets in memory, shared by the threads of the process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def _bucket(self, key: str, burst: int = 0) -> _Bucket:
+        """Get the bucket of the key. Must be called while holding the lock."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(tokens=burst, updated=time.monotonic())
+            self._buckets[key] = bucket
+        return bucket
+
+    def reserve(self, key: str, requests_per_second: float, burst: int) -> float:
+        with self._lock:
+            bucket = self._bucket(key, burst)
+            return bucket.reserve(time.monotonic(), requests_per_second, burst)
+
+    def cancel(self, key: str, burst: int) -> None:
+        with self._lock:
+            self._bucket(key, burst).cancel(burst)
+
+    def pause(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._bucket(key).pause(time.monotonic(), seconds)
+
+    def pause_remaining(self, key: str) -> float:
+        with self._lock:
+            # A read, so an unknown key does not get a bucket
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return 0.0
+            return max(0.0, bucket.paused_until - time.monotonic())
+
+
+class FileRateLimitBackend(RateLimitBackend):
+    """Keeps the token buckets in files in a directory, so the limits and the ``Retry-After``
+    pauses are shared by all processes on the machine using the same directory.
+    Access is serialized between processes with a lock file per key.
+
+    Arguments:
+        directory (str): Directory of the bucket files. Created if it does not exist.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    @staticmethod
+    def _load(path: str) -> Optional[_Bucket]:
+        """Load a bucket file, None if it does not exist or is invalid."""
+        try:
+            with open(f"{path}.json", "rb") as file:
+                return _Bucket(**json.loads(file.read()))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    @contextlib.contextmanager
+    def _locked_bucket(self, key: str, burst: int = 0) -> Iterator[_Bucket]:
+        """Load the bucket of the key while holding the lock, and save it afterwards."""
+        path = self._path(key)
+        with FileLock(f"{path}.lock"):
+            bucket = self._load(path)
+            if bucket is None:
+                bucket = _Bucket(tokens=burst, updated=time.time())
+            yield bucket
+            atomic_write(f"{path}.json", json.dumps(asdict(bucket)).encode(), mode=0o644)
+
+    def reserve(self, key: str, requests_per_second: float, burst: int) -> float:
+        # Wall clock time, as monotonic clocks are not comparable between processes
+        with self._locked_bucket(key, burst) as bucket:
+            return bucket.reserve(time.time(), requests_per_second, burst)
+
+    def cancel(self, key: str, burst: int) -> None:
+        with self._locked_bucket(key, burst) as bucket:
+            bucket.cancel(burst)
+
+    def pause(self, key: str, seconds: float) -> None:
+        with self._locked_bucket(key) as bucket:
+            bucket.pause(time.time(), seconds)
+
+    def pause_remaining(self, key: str) -> float:
+        # The bucket files are replaced atomically, so they are read without the lock,
+        # and an unknown key does not get a bucket file
+        bucket = self._load(self._path(key))
+        if bucket is None:
+            return 0.0
+        return max(0.0, bucket.paused_until - time.time())
+
+
+class RateLimiter:
+    """A client-side rate limiter shared by all threads using a client.
+    Each key (e.g. an endpoint) has its own token bucket, allowing ``requests_per_second``
+    on average with bursts of up to ``burst`` requests, and optionally a limit on the number
+    of requests in flight.
+
+    When the server asks clients to back off (``Retry-After`` on HTTP 429/503), `pause`
+    holds all requests for the key, and the bucket restarts empty, so the requests resume at
+    the configured rate instead of in a burst.
+
+    The buckets are kept in memory by default. To share the limits between processes on the
+    machine, use a `FileRateLimitBackend`. The limit on requests in flight always applies
+    per process.
+
+    Arguments:
+        requests_per_second (float): The average number of requests per second per key.
+        burst (int): The maximum number of requests sent at once after an idle period.
+            Defaults to 1.
+        max_concurrent (Optional[int]): The maximum number of requests in flight per key.
+            Defaults to None (no limit).
+        backend (Optional[RateLimitBackend]): The storage of the token buckets.
+            Defaults to a `MemoryRateLimitBackend`.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float,
+        burst: int = 1,
+        max_concurrent: Optional[int] = None,
+        backend: Optional[RateLimitBackend] = None,
+    ) -> None:
+        if requests_per_second <= 0:
+            raise ValueError(f"requests_per_second must be positive, got {requests_per_second}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def reserve(self, key: str) -> float:
+        """Reserve a request for the key, without waiting.
+
+        Returns:
+            float: The number of seconds to wait before sending the request.
+        """
+        return self.backend.reserve(key, self.requests_per_second, self.burst)
+
+    def acquire(self, key: str, deadline: Optional[Deadline] = None) -> None:
+        """Wait until a request for the key may be sent.
+
+        Args:
+            key (str): The key.
+            deadline (Optional[Deadline]): The deadline of the call, c.f.
+                `dupla.deadline.current_deadline`. Defaults to None.
+
+        Raises:
+            DuplaDeadlineExceeded: If the request could not be sent before the deadline.
+                Raised without waiting, and the reservation is given back.
+        """
+        delay = self.reserve(key)
+        while delay > 0:
+            if deadline is not None and delay >= deadline.remaining():
+                self.backend.cancel(key, self.burst)
+                raise DuplaDeadlineExceeded(
+                    f"The deadline of {deadline.seconds} seconds would be exceeded while "
+                    f"waiting for the rate limit of {key}"
+                )
+            time.sleep(delay)
+            if self.pause_remaining(key) <= 0:
+                return
+            # The key was paused while waiting: take a new reservation after the pause, so the
+            # waiting requests resume at the configured rate instead of all at once
+            delay = self.reserve(key)
+
+    def pause_remaining(self, key: str) -> float:
+        """The number of seconds the key is still paused."""
+        return self.backend.pause_remaining(key)
+
+    @contextlib.contextmanager
+    def limit(self, key: str, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """Context manager around a request for the key, waiting for both a free slot
+        (c.f. ``max_concurrent``) and the rate limit.
+
+        Raises:
+            DuplaDeadlineExceeded: If the request could not be sent before the deadline,
+                c.f. `acquire`.
+        """
+        if self.max_concurrent is None:
+            self.acquire(key, deadline)
+            yield
+            return
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_concurrent)
+                self._semaphores[key] = semaphore
+        timeout = deadline.remaining() if deadline is not None else None
+        if not semaphore.acquire(timeout=timeout):
+            raise DuplaDeadlineExceeded(
+                f"The deadline of {deadline.seconds} seconds was exceeded while waiting for "
+                f"a free slot for {key}"
+            )
+        try:
+            self.acquire(key, deadline)
+            yield
+        finally:
+            semaphore.release()
+
+    def pause(self, key: str, seconds: float) -> None:
+        """Hold all requests for the key for a number of seconds, e.g. from a ``Retry-After``
+        header. The requests resume at the configured rate."""
+        self.backend.pause(key, seconds)
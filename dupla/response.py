@@ -0,0 +1,84 @@
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+from .abstract_payload import _get_alias
+
+__all__ = [
+    "BaseResponseModel",
+    "VirksomhedResponse",
+    "PersonResponse",
+    "LigningssagResponse",
+    "MomsResponse",
+    "parse_records",
+]
+
+MODEL_T = TypeVar("MODEL_T", bound=BaseModel)
+
+
+class BaseResponseModel(BaseModel):
+    """Base Pydantic model of a record in the ``data`` list of a DUPLA response.
+
+    The models only declare the fields shared with the payloads, using the same names and
+    aliases, c.f. ``dupla.abstract_payload.ALIAS_MAPPING``. The other fields of the records
+    are kept as extra fields, e.g. ``record.model_extra["SagTypeKode"]``. Subclass a model
+    to declare more fields, and set it as the ``response_model`` of the payload class.
+    """
+
+    model_config = ConfigDict(alias_generator=_get_alias, populate_by_name=True, extra="allow")
+
+
+class VirksomhedResponse(BaseResponseModel):
+    """A record about a company."""
+
+    cvr: Optional[str] = Field(default=None)
+    se: Optional[str] = Field(default=None)
+
+
+class PersonResponse(BaseResponseModel):
+    """A record about a person."""
+
+    cpr: Optional[str] = Field(default=None)
+
+
+class LigningssagResponse(VirksomhedResponse):
+    """A tax assessment case (Ligningssag), about a company or a person."""
+
+    cpr: Optional[str] = Field(default=None)
+
+
+class MomsResponse(VirksomhedResponse):
+    """A VAT return (Momsangivelse)."""
+
+    afregning_start: Optional[date] = Field(default=None)
+    afregning_slut: Optional[date] = Field(default=None)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def parse_records(
+    model: Type[MODEL_T], data: List[Dict[str, Any]], trusted: bool = False
+) -> List[MODEL_T]:
+    """Convert the records of a response to models.
+
+    Args:
+        model (Type[BaseModel]): The model of the records.
+        data (List[Dict[str, Any]]): The records, as returned by ``get_data``.
+        trusted (bool): Construct the models without validation, for speed. The values are
+            kept as returned by the API, e.g. dates are not parsed. Defaults to False.
+
+    Raises:
+        pydantic.ValidationError: If a record does not match the model.
+
+    Returns:
+        List[BaseModel]: One model per record.
+    """
+    if trusted:
+        return [model.model_construct(**record) for record in data]
+    # The whole list is validated in one call
+    return _list_adapter(model).validate_python(data)
@@ -1,6 +1,51 @@
-from typing import Any
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
 import requests
 
+from .deadline import current_deadline
+
+logger = logging.getLogger(__file__)
+
+__all__ = ["RetryPolicy", "RetryBudget", "RetryStats"]
+
+_retry_timeouts: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "dupla_retry_timeouts", default=True
+)
+
+
+@contextlib.contextmanager
+def timeout_retries(enabled: bool) -> Iterator[None]:
+    """Set whether the `RetryPolicy` calls in the block retry timeouts, e.g. to split a
+    request which timed out at once, c.f. `DuplaAccess.get_data_partial`."""
+    token = _retry_timeouts.set(enabled)
+    try:
+        yield
+    finally:
+        _retry_timeouts.reset(token)
+
+
+def is_retryable_status(status: int) -> bool:
+    """Return True if a request which failed with the HTTP status code should be retried.
+
+    Args:
+        status: HTTP status code of the response.
+
+    Returns:
+        True for HTTP 5xx server errors and 429 (too many requests), otherwise False.
+    """
+    if status >= 500 and status < 600:
+        return True  # 5xx server errors
+    if status == 429:  # too many requests
+        return True
+    return False
+
 
 def stop_retry_on_err(exc: Exception) -> bool:
     """Return True if the http-get action should be cancelled (not retried) due to the received exception.
@@ -18,20 +63,256 @@ def stop_retry_on_err(exc: Exception) -> bool:
 
     # HTTP errors → inspect status code
     if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
-        status = exc.response.status_code
-        if status >= 500 and status < 600:
-            return False                    # 5xx server errors
-        if status == 429:  # too many requests
-            return False
-        return True
+        return not is_retryable_status(exc.response.status_code)
 
     # Everything else → don't retry
     return True
 
 
-def parse_header_retry_after(response_header: dict[str,Any], fallback: float = 1) -> float:
+# HTTP client errors which may be caused by one of the IDs of a request, e.g. a malformed or
+# unknown entity (400, 422) or a request or response too large (413, 414). Other client
+# errors (e.g. 401, 403, 404) are about the request or the agreement, and fail for any ID.
+BISECTABLE_STATUSES = frozenset({400, 413, 414, 422})
+
+
+def is_bisectable_error(exc: BaseException) -> bool:
+    """Return True if a request with several IDs which failed with the exception may succeed
+    for a part of the IDs, c.f. `DuplaAccess.get_data_partial`.
+
+    Args:
+        exc: Exception raised for the request, after its retries.
+
+    Returns:
+        True for timeouts and the HTTP statuses in ``BISECTABLE_STATUSES``, otherwise False.
+    """
+    if isinstance(exc, requests.exceptions.Timeout):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code in BISECTABLE_STATUSES
+    return False
+
+
+def parse_header_retry_after(
+    response_header: dict[str, Any], fallback: Optional[float] = 1
+) -> Optional[float]:
     try:
         return float(response_header["Retry-After"])
     except Exception:
         return fallback
-    
\ No newline at end of file
+
+
+class RetryBudget:
+    """Limits the retries to a fraction of the requests, so retries do not multiply the
+    load on the API during an outage. Share one budget between all clients of the process.
+
+    Every request adds ``ratio`` tokens to the budget, and every retry takes one token.
+    A minimum of ``min_retries_per_second`` retries is always allowed, so a client with
+    little traffic can still retry.
+
+    Arguments:
+        ratio (float): The allowed number of retries per request. Defaults to 0.2.
+        min_retries_per_second (float): The retries allowed regardless of the number of
+            requests. Defaults to 1.
+        max_tokens (float): The maximum number of saved up retries. Defaults to 100.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_retries_per_second: float = 1.0, max_tokens: float = 100
+    ) -> None:
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+
+    def _refill(self, tokens: float) -> None:
+        """Add tokens, and the minimum retries since the last update. Must hold the lock."""
+        now = time.monotonic()
+        tokens += (now - self._updated) * self.min_retries_per_second
+        self._tokens = min(self.max_tokens, self._tokens + tokens)
+        self._updated = now
+
+    def record_request(self) -> None:
+        """Add the tokens of a request."""
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_retry(self) -> bool:
+        """Take the token of a retry. Returns False if the budget is spent."""
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+@dataclass
+class RetryStats:
+    """Counters of a `RetryPolicy`. ``attempts`` includes the first attempt of each call."""
+
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0
+    budget_exhausted: int = 0
+    deadline_exceeded: int = 0
+
+
+class RetryPolicy:
+    """Decides whether and when a failed request is retried.
+
+    Network errors (``ConnectionError`` and ``Timeout``), HTTP 5xx and 429 are retried with
+    exponential backoff and full jitter, i.e. a random delay between 0 and
+    ``base_delay * 2 ** (retry - 1)``, capped at ``max_delay``. The ``Retry-After`` header of
+    HTTP 429 and 503 responses is used as the delay when present.
+
+    A call stops retrying after ``max_tries`` attempts in total, when the next attempt would
+    start after the ``deadline``, when the total sleep would exceed ``max_total_sleep``, or
+    when the retry ``budget`` is spent. The error of the last attempt is then raised, with the
+    number of attempts in its ``attempts`` attribute. Retries are also not started after
+    the deadline of the call, c.f. `dupla.deadline.deadline_scope`. Timeouts are not retried
+    in a `timeout_retries` block which disables them.
+
+    The policy is safe to share between threads and clients.
+
+    Arguments:
+        max_tries (int): The maximum number of attempts of a request. Defaults to 8.
+        deadline (Optional[float]): The number of seconds after the first attempt in which
+            retries may start. Defaults to None (no deadline).
+        base_delay (float): The maximum delay of the first retry in seconds. Defaults to 1.
+        max_delay (float): The maximum delay of a retry in seconds. Defaults to 60.
+        max_total_sleep (Optional[float]): The maximum total delay of the retries of a
+            request in seconds. Defaults to None (no limit).
+        budget (Optional[RetryBudget]): A retry budget, shared by the clients of the process.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        max_tries: int = 8,
+        deadline: Optional[float] = None,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_total_sleep: Optional[float] = None,
+        budget: Optional[RetryBudget] = None,
+    ) -> None:
+        if max_tries < 1:
+            raise ValueError(f"max_tries must be at least 1, got {max_tries}")
+        self.max_tries = max_tries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_sleep = max_total_sleep
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._stats = RetryStats()
+
+    @property
+    def stats(self) -> RetryStats:
+        """A snapshot of the counters."""
+        with self._lock:
+            return RetryStats(**vars(self._stats))
+
+    def _count(self, **counters: int) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self._stats, name, getattr(self._stats, name) + value)
+
+    def backoff(self, retry: int) -> float:
+        """The delay before the retry (1 for the first retry), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def start(self) -> "RetryState":
+        """Start a call, c.f. `next_delay`."""
+        self._count(calls=1, attempts=1)
+        if self.budget is not None:
+            self.budget.record_request()
+        return RetryState(started=time.monotonic())
+
+    def next_delay(
+        self, state: "RetryState", retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """Decide on a retry after a retryable failure of the call.
+
+        Args:
+            state (RetryState): The state of the call, from `start`.
+            retry_after (Optional[float]): The delay requested by the server, if any.
+
+        Returns:
+            Optional[float]: The number of seconds to wait before the next attempt, or None
+                if the call should not be retried.
+        """
+        if state.attempts >= self.max_tries:
+            return None
+        delay = self.backoff(state.attempts) if retry_after is None else max(retry_after, 0.0)
+        if self.deadline is not None and state.elapsed() + delay > self.deadline:
+            self._count(deadline_exceeded=1)
+            return None
+        # The deadline of the call, c.f. `dupla.deadline.deadline_scope`
+        call_deadline = current_deadline()
+        if call_deadline is not None and delay >= call_deadline.remaining():
+            self._count(deadline_exceeded=1)
+            return None
+        if self.max_total_sleep is not None and state.slept + delay > self.max_total_sleep:
+            return None
+        if self.budget is not None and not self.budget.try_retry():
+            self._count(budget_exhausted=1)
+            return None
+        state.attempts += 1
+        state.slept += delay
+        self._count(attempts=1, retries=1)
+        return delay
+
+    def fail(self, state: "RetryState", error: BaseException) -> None:
+        """Record the failure of the call, and set the number of attempts on the error."""
+        self._count(failures=1)
+        error.attempts = state.attempts
+
+    def call(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """Send a request with retries.
+
+        Args:
+            send (Callable[[], requests.Response]): Sends the request. HTTP errors are
+                raised from here, and should not be raised by ``send``.
+
+        Raises:
+            requests.exceptions.RequestException: The error of the last attempt.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        state = self.start()
+        while True:
+            retry_after = None
+            try:
+                response = send()
+                if response.status_code in (429, 503):
+                    retry_after = parse_header_retry_after(response.headers, fallback=None)
+                response.raise_for_status()
+                return response
+            except requests.exceptions.RequestException as e:
+                if stop_retry_on_err(e) or (
+                    isinstance(e, requests.exceptions.Timeout) and not _retry_timeouts.get()
+                ):
+                    delay = None
+                else:
+                    delay = self.next_delay(state, retry_after)
+                if delay is None:
+                    self.fail(state, e)
+                    raise
+                logger.debug("Retry %d in %.2f seconds after %r", state.attempts - 1, delay, e)
+            time.sleep(delay)
+
+
+@dataclass
+class RetryState:
+    """The progress of the retries of one call."""
+
+    started: float
+    attempts: int = 1
+    slept: float = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
@@ -0,0 +1,113 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+__all__ = ["NotAListError", "iter_json_array"]
+
+_WHITESPACE = " \t\n\r"
+# Drop the consumed part of the buffer once it is this long
+_TRIM_LENGTH = 64 * 1024
+
+
+class NotAListError(ValueError):
+    """The streamed key did not hold a list."""
+
+
+class _Reader:
+    """A text buffer over an iterable of encoded chunks, which is decoded incrementally."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> None:
+        """Read the next chunk into the buffer. Raises ValueError at the end of the input."""
+        if self.eof:
+            raise ValueError("Unexpected end of the JSON document")
+        if self.pos >= _TRIM_LENGTH:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            self.buffer += self._decoder.decode(b"", final=True)
+            return
+        self.buffer += self._decoder.decode(chunk)
+
+    def peek(self) -> str:
+        """Skip whitespace, and get the next character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self.fill()
+
+    def expect(self, *chars: str) -> str:
+        """Consume the next character, which must be one of the characters."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next JSON value, reading more chunks until it is complete."""
+        self.peek()
+        decoder = json.JSONDecoder()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number may continue in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "data") -> Iterator[Any]:
+    """Incrementally parse a JSON object, e.g. a streamed response body, and yield the
+    elements of the list under ``key`` as they are read. Only one element is decoded at a
+    time, so the memory use does not depend on the length of the list.
+    The rest of the document after the list is not read.
+
+    Args:
+        chunks (Iterable[bytes]): The UTF-8 encoded JSON document, in chunks of any size.
+        key (str): The key of the list in the top-level object. Defaults to "data".
+
+    Raises:
+        NotAListError: If the key does not hold a list.
+        ValueError: If the document is not valid JSON, or does not have the key.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        raise ValueError(f"The key {key!r} is missing")
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key:
+            break
+        reader.value()
+        if reader.expect(",", "}") == "}":
+            raise ValueError(f"The key {key!r} is missing")
+
+    if reader.peek() != "[":
+        raise NotAListError(f"The key {key!r} holds {reader.value()!r}, not a list")
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",", "]") == "]":
+            return
@@ -0,0 +1,96 @@
+import abc
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import ContextManager, Optional
+
+from ._filelock import FileLock, atomic_write
+
+__all__ = ["StoredToken", "TokenStore", "FileTokenStore", "token_store_key"]
+
+logger = logging.getLogger(__file__)
+
+
+@dataclass(frozen=True)
+class StoredToken:
+    """A JWT token shared through a `TokenStore`.
+
+    Arguments:
+        access_token (str): The JWT token.
+        expiration_time (datetime): The (timezone aware) expiration time of the token.
+        expires_in (float): The lifetime of the token in seconds, as returned by BAT.
+    """
+
+    access_token: str
+    expiration_time: datetime
+    expires_in: float
+
+
+def token_store_key(billetautomat_url: str, certificate_fingerprint: str) -> str:
+    """Build the key under which a token is stored. A token is shared between clients
+    using the same authentication service and the same certificate."""
+    return hashlib.sha256(f"{billetautomat_url}|{certificate_fingerprint}".encode()).hexdigest()
+
+
+class TokenStore(abc.ABC):
+    """Interface for a store sharing JWT tokens between clients, e.g. across processes."""
+
+    @abc.abstractmethod
+    def load(self, key: str) -> Optional[StoredToken]:
+        """Load the token stored under the key. Returns None if there is no token."""
+
+    @abc.abstractmethod
+    def save(self, key: str, token: StoredToken) -> None:
+        """Store the token under the key, replacing any previous token."""
+
+    def lock(self, key: str) -> ContextManager:
+        """A lock held while a client checks the store and possibly fetches a new token, so
+        only one client fetches the token at a time. The default implementation does not lock."""
+        return contextlib.nullcontext()
+
+
+class FileTokenStore(TokenStore):
+    """Token store keeping one JSON file per key in a directory.
+    Access is serialized between processes with a lock file per key.
+
+    Arguments:
+        directory (str): Directory of the token files. Created if it does not exist.
+            The token files are only readable by the current user.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[StoredToken]:
+        try:
+            with open(self._path(key), "rb") as file:
+                content = json.loads(file.read())
+            return StoredToken(
+                access_token=content["access_token"],
+                expiration_time=datetime.fromisoformat(content["expiration_time"]),
+                expires_in=float(content["expires_in"]),
+            )
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Ignoring unreadable token file for key %s", key, exc_info=True)
+            return None
+
+    def save(self, key: str, token: StoredToken) -> None:
+        content = {
+            "access_token": token.access_token,
+            "expiration_time": token.expiration_time.isoformat(),
+            "expires_in": token.expires_in,
+        }
+        atomic_write(self._path(key), json.dumps(content).encode())
+
+    def lock(self, key: str) -> ContextManager:
+        return FileLock(os.path.join(self.directory, f"{key}.lock"))
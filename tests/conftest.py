@@ -4,13 +4,39 @@ import pytest
 import requests
 import requests_pkcs12
 
+from dupla.base import clear_pkcs12_cache
 from dupla.endpoint import DuplaAccess
 
+# The original method, as _run_payload is mocked by default in the tests
+RUN_PAYLOAD = DuplaAccess._run_payload
+
 
 class Object:
     pass
 
 
+def _create_response(
+    status_code: int = 200, content: bytes = b'{"data": []}', headers=None
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+def _build_api(**kwargs) -> DuplaAccess:
+    return DuplaAccess(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        r"http://billetautomat.dk/url",
+        base_url=r"https://dummy.com",
+        **kwargs,
+    )
+
+
 def get_jwt_token_response(expiration_time: int):
     response = Object()
     response.status_code = 200
@@ -52,7 +78,9 @@ def mock_session_request(mocker, session_object):
 def mock_session_pkcs(mocker):
     mock_pkcs = mocker.patch.object(requests_pkcs12, "Pkcs12Adapter", autospec=True)
     mock_pkcs.return_value = Object()
-    return mock_pkcs
+    clear_pkcs12_cache()
+    yield mock_pkcs
+    clear_pkcs12_cache()
 
 
 @pytest.fixture
@@ -92,3 +120,29 @@ def mocked_requests_very_short_expiration_time(get_mocked_requests_for_expiratio
 @pytest.fixture
 def mocked_requests_long_expiration_time(get_mocked_requests_for_expiration):
     return get_mocked_requests_for_expiration(expiration_time=180)
+
+
+@pytest.fixture
+def create_response():
+    """A factory of API responses, by default successful with no data."""
+    return _create_response
+
+
+@pytest.fixture
+def build_api():
+    """A factory of clients, with one attempt per request by default.
+    ``_run_payload`` is mocked, c.f. `mock_run_payload`."""
+
+    def _build(max_tries: int = 1, **kwargs) -> DuplaAccess:
+        return _build_api(max_tries=max_tries, **kwargs)
+
+    return _build
+
+
+@pytest.fixture
+def create_api(mocker, mock_session_request, mocked_requests_long_expiration_time):
+    """A factory of clients sending the requests through the mocked session, with the
+    original ``_run_payload``. The requests succeed with no data by default."""
+    mocker.patch.object(DuplaAccess, "_run_payload", RUN_PAYLOAD)
+    mock_session_request.return_value = _create_response()
+    return _build_api
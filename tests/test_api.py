@@ -1,5 +1,8 @@
 import random
+import threading
+import time
 import uuid
+from concurrent.futures import CancelledError
 from datetime import date, datetime, timedelta
 from typing import Type
 
@@ -251,3 +254,153 @@ def test_mom_udstilling(faker):
         assert fmt.tzname() == "UTC"
         exp = payload[key]
         cmp_datetime(fmt, exp)
+
+
+def test_get_data_many(mock_run_payload):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: [payload]
+    api = build_dummy_api()
+    payloads = [dp.payload.KtrPayload(se=get_fake_se()) for _ in range(20)]
+
+    results = api.get_data_many(payloads, max_workers=4)
+
+    assert mock_run_payload.call_count == 20
+    assert [r.index for r in results] == list(range(20))
+    for result, payload in zip(results, payloads):
+        assert result.ok
+        assert result.payload is payload
+        assert result.data == [payload.get_payload()]
+
+
+def test_get_data_many_errors(mock_run_payload):
+    bad_se = "12345678"
+
+    def runner(self, payload, endpoint):
+        if payload[DuplaApiKeys.SE] == [bad_se]:
+            raise dp.DuplaApiException("Failed")
+        return []
+
+    mock_run_payload.side_effect = runner
+    api = build_dummy_api()
+    payloads = [dp.payload.KtrPayload(se=get_fake_se()) for _ in range(5)]
+    payloads.insert(2, dp.payload.KtrPayload(se=[bad_se]))
+
+    results = api.get_data_many(payloads, ordered=False)
+
+    assert len(results) == 6
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 1
+    assert failed[0].index == 2
+    assert isinstance(failed[0].error, dp.DuplaApiException)
+
+
+def test_get_data_many_cancel_on_error(mock_run_payload):
+    def runner(self, payload, endpoint):
+        raise dp.DuplaApiException("Failed")
+
+    mock_run_payload.side_effect = runner
+    api = build_dummy_api()
+    payloads = [dp.payload.KtrPayload(se=get_fake_se()) for _ in range(50)]
+
+    results = api.get_data_many(payloads, max_workers=1, cancel_on_error=True)
+
+    assert len(results) == 50
+    assert not any(r.ok for r in results)
+    assert mock_run_payload.call_count < 50
+    assert any(isinstance(r.error, CancelledError) for r in results)
+
+
+def test_get_data_many_requests_chunks_sequentially(mock_run_payload, mocker):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def runner(self, payload, endpoint):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return list(payload[DuplaApiKeys.SE])
+
+    mock_run_payload.side_effect = runner
+    mocker.patch.object(dp.payload.KtrPayload, "chunk_size", 2)
+    api = build_dummy_api()
+    payloads = [dp.payload.KtrPayload(se=get_fake_se(n=8)) for _ in range(6)]
+
+    results = api.get_data_many(payloads, max_workers=3)
+
+    assert mock_run_payload.call_count == 6 * 4
+    assert all(result.data == payload.se for result, payload in zip(results, payloads))
+    # The chunks do not add to the workers of get_data_many
+    assert max_in_flight <= 3
+
+
+def test_get_data_chunked(mock_run_payload, mocker):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: list(payload[DuplaApiKeys.SE])
+    mocker.patch.object(dp.payload.KtrPayload, "chunk_size", 7)
+    api = build_dummy_api()
+    se = get_fake_se(n=30)
+
+    data = api.get_data(dp.payload.KtrPayload(se=se))
+
+    assert mock_run_payload.call_count == 5
+    assert data == se
+
+
+def test_get_data_chunk_error(mock_run_payload, mocker):
+    mock_run_payload.side_effect = dp.DuplaApiException("Failed")
+    mocker.patch.object(dp.payload.KtrPayload, "chunk_size", 1)
+    api = build_dummy_api()
+
+    with pytest.raises(dp.DuplaApiException):
+        api.get_data(dp.payload.KtrPayload(se=get_fake_se(n=30)))
+
+
+def test_get_data_date_window(mock_run_payload):
+    def runner(self, payload, endpoint):
+        # The record at the boundary is returned for both windows
+        return {
+            "2023-01-01": [{"Dato": "2023-01-01"}, {"Dato": "2023-02-01"}],
+            "2023-02-01": [{"Dato": "2023-02-01"}, {"Dato": "2023-02-15"}],
+        }[payload[DuplaApiKeys.TEKNISK_REGISTRERING_FRA]]
+
+    mock_run_payload.side_effect = runner
+    api = build_dummy_api()
+    payload = dp.payload.KtrPayload(
+        se=get_fake_se(), registrering_fra="2023-01-01", registrering_til="2023-02-28"
+    )
+
+    data = api.get_data(payload, date_window="month")
+
+    assert mock_run_payload.call_count == 2
+    assert data == [{"Dato": "2023-01-01"}, {"Dato": "2023-02-01"}, {"Dato": "2023-02-15"}]
+
+
+def test_get_data_date_window_keeps_repeats(mock_run_payload):
+    def runner(self, payload, endpoint):
+        return {
+            # A record repeated within a window
+            "2023-01-01": [{"Dato": "2023-01-15"}, {"Dato": "2023-01-15"}, {"Dato": "2023-02-01"}],
+            "2023-02-01": [{"Dato": "2023-02-01"}, {"Dato": "2023-03-01"}],
+            # A record of a window which is not adjacent
+            "2023-03-01": [{"Dato": "2023-03-01"}, {"Dato": "2023-01-15"}],
+        }[payload[DuplaApiKeys.TEKNISK_REGISTRERING_FRA]]
+
+    mock_run_payload.side_effect = runner
+    api = build_dummy_api()
+    payload = dp.payload.KtrPayload(
+        se=get_fake_se(), registrering_fra="2023-01-01", registrering_til="2023-03-31"
+    )
+
+    data = api.get_data(payload, date_window="month")
+
+    assert mock_run_payload.call_count == 3
+    assert data == [
+        {"Dato": "2023-01-15"},
+        {"Dato": "2023-01-15"},
+        {"Dato": "2023-02-01"},
+        {"Dato": "2023-03-01"},
+        {"Dato": "2023-01-15"},
+    ]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+import pytest
+
+import dupla as dp
+
+httpx = pytest.importorskip("httpx")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in for BAT and the DUPLA API. Replies to GET requests from a script of
+    (status, headers) tuples, followed by successful replies echoing the query string."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: dict, headers: Optional[dict] = None):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, val in (headers or {}).items():
+            self.send_header(key, val)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.token_requests += 1
+        self._reply(200, {"access_token": str(uuid.uuid4()), "expires_in": 300})
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.headers["Authorization"])
+            script = self.server.script.pop(0) if self.server.script else None
+        if script is not None:
+            status, headers = script
+            self._reply(status, {}, headers)
+        else:
+            self._reply(200, {"data": [{"path": self.path}]})
+
+
+@pytest.fixture
+def stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.token_requests = 0
+    server.requests: List[str] = []
+    server.script: List[Tuple[int, dict]] = []
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def build_async_api(server, **kwargs) -> dp.AsyncDuplaAccess:
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return dp.AsyncDuplaAccess(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        f"{url}/token",
+        base_url=url,
+        bat_client=httpx.AsyncClient(),
+        **kwargs,
+    )
+
+
+def test_async_get_data(stand_in_server):
+    payload = dp.payload.MomsPayload(
+        se=["12345678"], afregning_start="2023-01-01", afregning_slut="2023-12-31"
+    )
+
+    async def run():
+        async with build_async_api(stand_in_server) as api:
+            return await api.get_data(payload)
+
+    data = asyncio.run(run())
+    assert len(data) == 1
+    assert data[0]["path"].startswith("/Momsangivelse?")
+    assert "12345678" in data[0]["path"]
+    assert stand_in_server.token_requests == 1
+
+
+def test_async_retry_after(stand_in_server):
+    stand_in_server.script = [(429, {"Retry-After": "0"}), (503, {"Retry-After": "0"})]
+    payload = dp.payload.KtrPayload(se=["12345678"])
+
+    async def run():
+        async with build_async_api(stand_in_server, max_tries=3) as api:
+            return await api.get_data(payload)
+
+    assert len(asyncio.run(run())) == 1
+    assert len(stand_in_server.requests) == 3
+
+
+def test_async_no_retry_on_client_error(stand_in_server):
+    stand_in_server.script = [(400, {})]
+    payload = dp.payload.KtrPayload(se=["12345678"])
+
+    async def run():
+        async with build_async_api(stand_in_server, max_tries=3) as api:
+            return await api.get_data(payload)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert len(stand_in_server.requests) == 1
+
+
+def test_async_many_share_one_token(stand_in_server):
+    payloads = [dp.payload.KtrPayload(se=[f"{i:08d}"]) for i in range(50)]
+
+    async def run():
+        async with build_async_api(stand_in_server, max_concurrency=10) as api:
+            return await api.get_data_many(payloads)
+
+    results = asyncio.run(run())
+    assert [r.index for r in results] == list(range(50))
+    assert all(r.ok for r in results)
+    assert stand_in_server.token_requests == 1
+    assert len(set(stand_in_server.requests)) == 1
+
+
+def test_async_circuit_breaker(stand_in_server):
+    stand_in_server.script = [(500, {})] * 2
+    payload = dp.payload.KtrPayload(se=["12345678"])
+    breaker = dp.CircuitBreaker(min_calls=2, window_size=2)
+
+    async def run():
+        async with build_async_api(stand_in_server, max_tries=5, circuit_breaker=breaker) as api:
+            return await api.get_data(payload)
+
+    with pytest.raises(dp.DuplaCircuitOpenException):
+        asyncio.run(run())
+    assert len(stand_in_server.requests) == 2
+    assert breaker.state("/Kontrolregistreringer/Virksomhed") == "open"
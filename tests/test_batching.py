@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+import dupla as dp
+from dupla.api_keys import DuplaApiKeys
+from dupla.batching import BatchingClient
+from dupla.exceptions import DuplaApiException, DuplaResponseException
+
+SE = [f"{i:08d}" for i in range(10)]
+PERIOD = {"afregning_start": date(2023, 1, 1), "afregning_slut": date(2023, 3, 31)}
+
+
+def records(self, payload, endpoint):
+    return [{DuplaApiKeys.SE: se, "period": "2023Q1"} for se in payload[DuplaApiKeys.SE]]
+
+
+def get_concurrently(client: BatchingClient, payloads):
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        futures = [executor.submit(client.get_data, payload) for payload in payloads]
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_single_id_calls_are_batched(mock_run_payload, build_api):
+    mock_run_payload.side_effect = records
+    client = BatchingClient(build_api(), max_wait=0.2)
+
+    payloads = [dp.payload.MomsPayload(se=[se], **PERIOD) for se in SE]
+    results = get_concurrently(client, payloads)
+
+    assert mock_run_payload.call_count == 1
+    payload = mock_run_payload.call_args.args[-2]
+    assert sorted(payload[DuplaApiKeys.SE]) == SE
+    assert results == [[{DuplaApiKeys.SE: se, "period": "2023Q1"}] for se in SE]
+    assert (client.calls, client.requests) == (10, 1)
+
+
+def test_max_batch_size(mock_run_payload, build_api):
+    mock_run_payload.side_effect = records
+    client = BatchingClient(build_api(), max_wait=0.5, max_batch_size=4)
+
+    results = get_concurrently(client, [dp.payload.MomsPayload(se=[se], **PERIOD) for se in SE])
+    assert mock_run_payload.call_count == 3
+    assert all(len(call.args[-2][DuplaApiKeys.SE]) <= 4 for call in mock_run_payload.mock_calls)
+    assert [result[0][DuplaApiKeys.SE] for result in results] == SE
+
+
+def test_different_parameters_are_not_batched(mock_run_payload, build_api):
+    mock_run_payload.side_effect = records
+    client = BatchingClient(build_api(), max_wait=0.1)
+
+    other_period = {"afregning_start": date(2023, 4, 1), "afregning_slut": date(2023, 6, 30)}
+    payloads = [
+        dp.payload.MomsPayload(se=SE[:1], **PERIOD),
+        dp.payload.MomsPayload(se=SE[1:2], **PERIOD),
+        dp.payload.MomsPayload(se=SE[2:3], **other_period),
+        dp.payload.LonsumPayload(se=SE[3:4]),
+    ]
+    results = get_concurrently(client, payloads)
+    assert mock_run_payload.call_count == 3
+    assert [result[0][DuplaApiKeys.SE] for result in results] == SE[:4]
+
+
+def test_id_keys(mock_run_payload, build_api):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: [
+        {"SENummer": se} for se in payload[DuplaApiKeys.SE]
+    ]
+    client = BatchingClient(build_api(), id_keys={DuplaApiKeys.SE: "SENummer"})
+    assert client.get_data(dp.payload.LonsumPayload(se=["00000042"])) == [{"SENummer": "00000042"}]
+
+
+def test_records_without_id_field(mock_run_payload, build_api):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: [
+        {"SENummer": se} for se in payload[DuplaApiKeys.SE]
+    ]
+    client = BatchingClient(build_api(), max_wait=0.2)
+
+    results = get_concurrently(client, [dp.payload.LonsumPayload(se=[se]) for se in SE[:3]])
+    assert mock_run_payload.call_count == 1
+    assert all(isinstance(result, DuplaResponseException) for result in results)
+
+
+def test_batch_error_is_raised_for_all(mock_run_payload, build_api):
+    mock_run_payload.side_effect = DuplaApiException("failed")
+    client = BatchingClient(build_api(), max_wait=0.2)
+
+    results = get_concurrently(client, [dp.payload.LonsumPayload(se=[se]) for se in SE[:3]])
+    assert mock_run_payload.call_count == 1
+    assert all(isinstance(result, DuplaApiException) for result in results)
+
+
+def test_invalid_batch_size(build_api):
+    with pytest.raises(ValueError):
+        BatchingClient(build_api(), max_batch_size=0)
@@ -0,0 +1,201 @@
+import json
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import dupla as dp
+from dupla.api_keys import DuplaApiKeys
+from dupla.cache import MemoryResponseCache, SQLiteResponseCache, cache_key
+
+ENDPOINT = "https://dummy.com/Virksomhedsstatus"
+
+
+def build_cached_api(cache) -> dp.DuplaAccess:
+    return dp.DuplaAccess(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        r"http://billetautomat.dk/url",
+        base_url=r"https://dummy.com",
+        max_tries=1,
+        response_cache=cache,
+    )
+
+
+def test_cache_key_is_canonical():
+    payload = {DuplaApiKeys.SE: ["12345678", "87654321"], DuplaApiKeys.STATUS_TYPE_KODE: [2, 1]}
+    reordered = {DuplaApiKeys.STATUS_TYPE_KODE: [1, 2], DuplaApiKeys.SE: ["87654321", "12345678"]}
+    assert cache_key(ENDPOINT, payload) == cache_key(ENDPOINT, reordered)
+    assert cache_key(ENDPOINT, payload) != cache_key("https://dummy.com/other", payload)
+    assert cache_key(ENDPOINT, payload) != cache_key(ENDPOINT, {DuplaApiKeys.SE: ["12345678"]})
+
+
+def test_memory_cache_hit_and_miss():
+    cache = MemoryResponseCache()
+    assert cache.get("key") is None
+    data = [{"a": 1}]
+    cache.set("key", data)
+    cached = cache.get("key")
+    assert cached == data
+    # The cache returns a copy of the data
+    cached[0]["a"] = 2
+    assert cache.get("key") == data
+
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.entries) == (2, 1, 1)
+    assert stats.size_bytes == len(b'[{"a":1}]')
+
+
+def test_memory_cache_ttl():
+    cache = MemoryResponseCache(default_ttl=0.1)
+    cache.set("key", [])
+    cache.set("long", [], ttl=10)
+    cache.set("disabled", [], ttl=0)
+    assert cache.get("key") == []
+    assert cache.get("disabled") is None
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert cache.get("long") == []
+    assert cache.stats.entries == 1
+
+
+def test_memory_cache_lru_eviction():
+    record = [{"a": "x" * 100}]
+    size = len(b'[{"a":""}]') + 100
+    cache = MemoryResponseCache(max_bytes=3 * size)
+    for key in "abc":
+        cache.set(key, record)
+    cache.get("a")  # a is now the most recently used
+    cache.set("d", record)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == record for key in "acd")
+    assert cache.stats.evictions == 1
+    assert cache.stats.size_bytes == 3 * size
+
+
+def test_get_data_cached(mock_run_payload):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: [{"Kode": 1}]
+    cache = MemoryResponseCache()
+    api = build_cached_api(cache)
+
+    first = api.get_data(dp.payload.VirksomhedsstatusPayload(se=["12345678", "87654321"]))
+    second = api.get_data(dp.payload.VirksomhedsstatusPayload(se=["87654321", "12345678"]))
+
+    assert first == second == [{"Kode": 1}]
+    assert mock_run_payload.call_count == 1
+    assert cache.stats.hits == 1
+
+
+@pytest.mark.parametrize("ttl,expected_calls", [(0, 2), (None, 1)])
+def test_payload_cache_ttl(mock_run_payload, mocker, ttl, expected_calls):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: []
+    mocker.patch.object(dp.payload.VirksomhedspligterPayload, "cache_ttl", ttl)
+    api = build_cached_api(MemoryResponseCache())
+
+    for _ in range(2):
+        api.get_data(dp.payload.VirksomhedspligterPayload(cvr=["12345678"]))
+
+    assert mock_run_payload.call_count == expected_calls
+
+
+def test_sqlite_cache(tmp_path):
+    path = str(tmp_path / "cache" / "responses.db")
+    cache = SQLiteResponseCache(path)
+    data = [{"a": "x" * 1000}] * 10
+    assert cache.get("key") is None
+    cache.set("key", data)
+    assert cache.get("key") == data
+
+    # Another instance, e.g. in another process or a rerun, sees the entry
+    other = SQLiteResponseCache(path)
+    assert other.get("key") == data
+    stats = other.stats
+    assert (stats.hits, stats.misses, stats.entries) == (1, 0, 1)
+    # The data is compressed
+    assert 0 < stats.size_bytes < len(json.dumps(data))
+
+
+def test_sqlite_cache_ttl(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.db"), default_ttl=0.1)
+    cache.set("key", [])
+    cache.set("long", [], ttl=10)
+    time.sleep(0.15)
+    assert cache.get("key") is None
+    assert cache.get("long") == []
+
+
+def test_sqlite_cache_eviction(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.db"), compression_level=0)
+    for key in "abc":
+        cache.set(key, [{"a": key * 100}])
+    cache.max_bytes = cache.stats.size_bytes
+    cache.get("a")  # a is now the most recently used
+    cache.set("d", [{"a": "d" * 100}])
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.stats.evictions == 1
+
+
+def test_sqlite_cache_keeps_total_size(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.db"), compression_level=0)
+    queries = []
+    cache._connection().set_trace_callback(queries.append)
+    for key in "abcab":
+        cache.set(key, [{"a": key * 100}])
+    cache.set("b", [{"a": "b" * 200}])
+    # The writes don't scan the table
+    assert not any("SUM(" in query for query in queries)
+
+    def sizes():
+        connection = cache._connection()
+        (total,) = connection.execute("SELECT size FROM total_size").fetchone()
+        (actual,) = connection.execute("SELECT SUM(size) FROM responses").fetchone()
+        return total, actual
+
+    total, actual = sizes()
+    assert total == actual == cache.stats.size_bytes
+    cache.max_bytes = total - 1
+    cache.set("d", [])
+    assert cache.stats.evictions == 1
+    assert sizes()[0] == sizes()[1]
+    cache.clear()
+    assert sizes()[0] == 0
+
+
+def write_entries(path: str, prefix: str) -> None:
+    cache = SQLiteResponseCache(path)
+    for i in range(20):
+        cache.set(f"{prefix}-{i}", [{"i": i}])
+
+
+def test_sqlite_cache_concurrent_processes(tmp_path):
+    path = str(tmp_path / "responses.db")
+    SQLiteResponseCache(path)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=ctx) as executor:
+        list(executor.map(write_entries, [path] * 3, "abc"))
+
+    cache = SQLiteResponseCache(path)
+    assert cache.stats.entries == 60
+    assert cache.get("b-7") == [{"i": 7}]
+
+
+def test_get_data_rerun_from_disk(tmp_path, mock_run_payload, mocker):
+    mock_run_payload.side_effect = lambda self, payload, endpoint: payload[DuplaApiKeys.SE]
+    mocker.patch.object(dp.payload.KtrPayload, "chunk_size", 2)
+    path = str(tmp_path / "responses.db")
+    se = [f"{i:08d}" for i in range(6)]
+
+    build_cached_api(SQLiteResponseCache(path)).get_data(dp.payload.KtrPayload(se=se[:4]))
+    assert mock_run_payload.call_count == 2
+
+    # A rerun only requests the chunk missing from the cache
+    data = build_cached_api(SQLiteResponseCache(path)).get_data(dp.payload.KtrPayload(se=se))
+    assert data == se
+    assert mock_run_payload.call_count == 3
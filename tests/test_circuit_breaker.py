@@ -0,0 +1,134 @@
+import time
+
+import pytest
+import requests
+
+from dupla.circuit_breaker import CircuitBreaker, circuit_key
+from dupla.exceptions import DuplaCircuitOpenException
+from dupla.payload import KtrPayload, MomsPayload
+from dupla.retry import RetryPolicy
+
+
+def fail(breaker: CircuitBreaker, key: str, n: int) -> None:
+    for _ in range(n):
+        breaker.acquire(key)
+        breaker.release(key, True)
+
+
+def test_opens_at_failure_rate():
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=4)
+    for failed in (False, True, False):
+        breaker.acquire("key")
+        breaker.release("key", failed)
+    # Only 3 requests, below min_calls
+    assert breaker.state("key") == "closed"
+    fail(breaker, "key", 1)
+    assert breaker.state("key") == "open"
+    with pytest.raises(DuplaCircuitOpenException) as e:
+        breaker.acquire("key")
+    assert e.value.endpoint == "key"
+    assert 0 < e.value.retry_after <= 30
+    # Other keys are not affected
+    assert breaker.state("other") == "closed"
+    breaker.acquire("other")
+
+
+def test_failures_outside_window_are_forgotten():
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=4, min_calls=4)
+    fail(breaker, "key", 1)
+    for _ in range(4):
+        breaker.acquire("key")
+        breaker.release("key", False)
+    fail(breaker, "key", 1)
+    assert breaker.state("key") == "closed"
+
+
+def test_unknown_outcomes_are_ignored():
+    breaker = CircuitBreaker(min_calls=1, window_size=1)
+    breaker.acquire("key")
+    breaker.release("key", None)
+    assert breaker.state("key") == "closed"
+
+
+def test_half_open_closes_after_trials():
+    breaker = CircuitBreaker(min_calls=1, window_size=1, open_seconds=0.05, half_open_max_calls=2)
+    fail(breaker, "key", 1)
+    time.sleep(0.06)
+    assert breaker.state("key") == "half_open"
+    breaker.acquire("key")
+    breaker.acquire("key")
+    # Only the trial requests are sent
+    with pytest.raises(DuplaCircuitOpenException):
+        breaker.acquire("key")
+    breaker.release("key", False)
+    assert breaker.state("key") == "half_open"
+    breaker.release("key", False)
+    assert breaker.state("key") == "closed"
+
+
+def test_half_open_reopens_on_failure():
+    breaker = CircuitBreaker(min_calls=1, window_size=1, open_seconds=0.05)
+    fail(breaker, "key", 1)
+    time.sleep(0.06)
+    fail(breaker, "key", 1)
+    assert breaker.state("key") == "open"
+
+
+def test_half_open_trial_without_outcome_is_freed():
+    breaker = CircuitBreaker(min_calls=1, window_size=1, open_seconds=0.05)
+    fail(breaker, "key", 1)
+    time.sleep(0.06)
+    breaker.acquire("key")
+    breaker.release("key", None)
+    breaker.acquire("key")
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"failure_rate": 0}, {"min_calls": 0}, {"min_calls": 30}, {"half_open_max_calls": 0}]
+)
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        CircuitBreaker(**kwargs)
+
+
+def test_circuit_key():
+    assert circuit_key("https://api.skat.dk/Momsangivelse") == "/Momsangivelse"
+
+
+def test_open_circuit_fails_fast(create_api, mock_session_request, create_response):
+    def respond(method, url, **kwargs):
+        if url.endswith("Kontrolregistreringer/Virksomhed"):
+            return create_response(500)
+        return create_response(200)
+
+    mock_session_request.side_effect = respond
+    breaker = CircuitBreaker(min_calls=3, window_size=3)
+    api = create_api(
+        retry_policy=RetryPolicy(max_tries=8, base_delay=0.001), circuit_breaker=breaker
+    )
+    payload = KtrPayload(se=["12345678"])
+    # The retries of the first call open the circuit
+    with pytest.raises(DuplaCircuitOpenException):
+        api.get_data(payload)
+    assert mock_session_request.call_count == 3
+    assert breaker.state("/Kontrolregistreringer/Virksomhed") == "open"
+
+    start = time.monotonic()
+    with pytest.raises(DuplaCircuitOpenException):
+        api.get_data(payload)
+    assert time.monotonic() - start < 0.1
+    assert mock_session_request.call_count == 3
+
+    # Other endpoints are still requested
+    moms = MomsPayload(se=["12345678"], afregning_start="2023-01-01", afregning_slut="2023-12-31")
+    assert api.get_data(moms) == []
+
+
+def test_client_errors_do_not_open_the_circuit(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(400)
+    breaker = CircuitBreaker(min_calls=1, window_size=1)
+    api = create_api(circuit_breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            api.get_data(KtrPayload(se=["12345678"]))
+    assert breaker.state("/Kontrolregistreringer/Virksomhed") == "closed"
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import dupla as dp
+from dupla.api_keys import DuplaApiKeys
+from dupla.exceptions import DuplaApiException
+
+SE = ["12345678"]
+
+
+def slow_response(self, payload, endpoint):
+    time.sleep(0.2)
+    return [{"se": se} for se in payload[DuplaApiKeys.SE]]
+
+
+def get_concurrently(api: dp.DuplaAccess, payloads):
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        futures = [executor.submit(api.get_data, payload) for payload in payloads]
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_identical_requests_are_coalesced(mock_run_payload, build_api):
+    mock_run_payload.side_effect = slow_response
+    api = build_api(coalesce_requests=True)
+
+    results = get_concurrently(api, [dp.payload.KtrPayload(se=SE) for _ in range(5)])
+    assert mock_run_payload.call_count == 1
+    assert all(result == [{"se": SE[0]}] for result in results)
+    # Every caller gets its own copy of the data
+    assert len({id(result[0]) for result in results}) == 5
+    assert api.coalesced_requests == 4
+
+    # The request is sent again once the previous one has completed
+    api.get_data(dp.payload.KtrPayload(se=SE))
+    assert mock_run_payload.call_count == 2
+
+
+def test_different_requests_are_not_coalesced(mock_run_payload, build_api):
+    mock_run_payload.side_effect = slow_response
+    api = build_api(coalesce_requests=True)
+
+    payloads = [dp.payload.KtrPayload(se=[f"{i:08d}"]) for i in range(3)]
+    results = get_concurrently(api, payloads)
+    assert mock_run_payload.call_count == 3
+    assert results == [[{"se": f"{i:08d}"}] for i in range(3)]
+
+
+def test_coalesced_error_is_raised_for_all(mock_run_payload, build_api):
+    def failing(self, payload, endpoint):
+        time.sleep(0.2)
+        raise DuplaApiException("failed")
+
+    mock_run_payload.side_effect = failing
+    api = build_api(coalesce_requests=True)
+
+    results = get_concurrently(api, [dp.payload.KtrPayload(se=SE) for _ in range(4)])
+    assert mock_run_payload.call_count == 1
+    assert all(isinstance(result, DuplaApiException) for result in results)
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_coalescing_is_opt_in(mock_run_payload, coalesce, build_api):
+    mock_run_payload.side_effect = slow_response
+    api = build_api(coalesce_requests=coalesce)
+
+    get_concurrently(api, [dp.payload.KtrPayload(se=SE) for _ in range(3)])
+    assert mock_run_payload.call_count == (1 if coalesce else 3)
+
+
+def test_follower_keeps_its_deadline(mock_run_payload, build_api):
+    def slower_response(self, payload, endpoint):
+        time.sleep(1)
+        return []
+
+    mock_run_payload.side_effect = slower_response
+    api = build_api(coalesce_requests=True)
+    payload = dp.payload.KtrPayload(se=SE)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(api.get_data, payload)
+        time.sleep(0.05)
+        start = time.monotonic()
+        with pytest.raises(dp.DuplaDeadlineExceeded):
+            api.get_data(payload, deadline=0.2)
+        assert time.monotonic() - start < 0.5
+        assert leader.result() == []
+    assert mock_run_payload.call_count == 1
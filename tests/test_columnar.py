@@ -0,0 +1,112 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+import requests
+
+from dupla.columnar import ColumnarResult
+from dupla.endpoint import DuplaAccess
+from dupla.payload import MomsPayload
+
+CODES = ["MOMS", "LØN", "SKAT"]
+
+
+def moms_records(count: int):
+    return [
+        {
+            "VirksomhedSENummer": f"{i:08d}",
+            "PligtKode": CODES[i % 3],
+            "MomsAngivelseBeløb": i * 1.25,
+            "AntalRettelser": i % 4,
+            "Rettet": i % 2 == 0,
+            "Bemærkning": None,
+        }
+        for i in range(count)
+    ]
+
+
+def test_round_trip():
+    records = moms_records(20)
+    records[3] = {"PligtKode": "MOMS", "Ekstra": [1, {"a": 2}]}
+    records[4]["AntalRettelser"] = 2**70
+    records[5]["MomsAngivelseBeløb"] = "ukendt"
+
+    result = ColumnarResult.from_records(records)
+    assert len(result) == 20
+    assert result.to_dicts() == records
+    assert list(result) == records
+    assert result == records
+    assert result[3] == records[3]
+    assert result[-1] == records[-1]
+    with pytest.raises(IndexError):
+        result[20]
+
+
+def test_types_are_kept():
+    records = [{"a": 1, "b": 1.0, "c": True, "d": "1"}, {"a": 2, "b": 2.5, "c": False, "d": "1"}]
+    result = ColumnarResult.from_records(records)
+    for key in "abcd":
+        assert [type(v) for v in result[key]] == [type(r[key]) for r in records]
+
+
+def test_columns():
+    result = ColumnarResult.from_records([{"a": 1}, {"b": "x"}, {"a": 3, "b": None}])
+    assert result.columns == ["a", "b"]
+    assert result["a"] == [1, None, 3]
+    assert result.column("b") == [None, "x", None]
+    with pytest.raises(KeyError):
+        result["c"]
+
+
+@pytest.mark.parametrize("indices", [slice(2, 8), slice(None, None, 3), slice(-4, None)])
+def test_slicing(indices):
+    records = moms_records(12)
+    result = ColumnarResult.from_records(records)
+    sliced = result[indices]
+    assert isinstance(sliced, ColumnarResult)
+    assert sliced.to_dicts() == records[indices]
+
+    # The slice is independent of the result
+    sliced.append({"PligtKode": "NY"})
+    assert "NY" not in result["PligtKode"]
+
+
+def test_memory_use():
+    def measure(build):
+        tracemalloc.start()
+        try:
+            value = build()
+            return value, tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+    content = json.dumps(moms_records(20_000)).encode()
+    records, records_size = measure(lambda: json.loads(content))
+    result, columnar_size = measure(lambda: ColumnarResult.from_records(json.loads(content)))
+    assert result == records
+    assert result[1000:1500:7].to_dicts() == records[1000:1500:7]
+    assert columnar_size * 5 < records_size
+
+
+def test_get_data_columnar(mock_session_request, mocked_requests_long_expiration_time):
+    records = moms_records(10)
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(json.dumps({"data": records}).encode())
+    mock_session_request.return_value = response
+    api = DuplaAccess(
+        "transaction_id",
+        "agreement_id",
+        "pkcs12_filename",
+        "pkcs12_password",
+        r"http://billetautomat.dk/url",
+        base_url=r"https://dummy.com",
+    )
+
+    payload = MomsPayload(
+        se=["12345678"], afregning_start="2023-01-01", afregning_slut="2023-03-31"
+    )
+    result = api.get_data_columnar(payload)
+    assert isinstance(result, ColumnarResult)
+    assert result.to_dicts() == records
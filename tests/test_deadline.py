@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from dupla.deadline import Deadline, current_deadline, deadline_scope, in_current_context
+from dupla.exceptions import DuplaDeadlineExceeded
+from dupla.payload import KtrPayload
+from dupla.ratelimit import RateLimiter
+from dupla.retry import RetryPolicy
+
+
+def test_default_timeouts(create_api, mock_session_request, mock_session_post):
+    api = create_api()
+    api.get_data(KtrPayload(se=["12345678"]))
+    assert mock_session_post.call_args.kwargs["timeout"] == (10, 60)
+    assert mock_session_request.call_args.kwargs["timeout"] == (10, 60)
+
+
+def test_client_timeout(create_api, mock_session_request, mock_session_post):
+    api = create_api(timeout=5)
+    api.get_data(KtrPayload(se=["12345678"]))
+    assert mock_session_post.call_args.kwargs["timeout"] == 5
+    assert mock_session_request.call_args.kwargs["timeout"] == 5
+
+
+def test_deadline_caps_timeouts(create_api, mock_session_request, mock_session_post):
+    api = create_api()
+    api.get_data(KtrPayload(se=["12345678"]), deadline=2)
+    for mock in (mock_session_post, mock_session_request):
+        connect, read = mock.call_args.kwargs["timeout"]
+        assert 1.5 < connect <= 2 and 1.5 < read <= 2
+
+
+def test_deadline_reaches_chunk_threads(create_api, mock_session_request):
+    KtrPayload.chunk_size, chunk_size = 2, KtrPayload.chunk_size
+    try:
+        api = create_api()
+        api.get_data(KtrPayload(se=[str(10000000 + i) for i in range(10)]), deadline=2)
+    finally:
+        KtrPayload.chunk_size = chunk_size
+    assert mock_session_request.call_count == 5
+    assert all(call.kwargs["timeout"][1] <= 2 for call in mock_session_request.mock_calls)
+    # The scope ends with the call
+    assert current_deadline() is None
+
+
+def test_deadline_stops_retries(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(503, b"", {"Retry-After": "0.2"})
+    api = create_api(retry_policy=RetryPolicy(max_tries=100))
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError):
+        api.get_data(KtrPayload(se=["12345678"]), deadline=0.5)
+    assert time.monotonic() - start < 0.5
+    # The attempts at 0, 0.2 and 0.4 seconds
+    assert mock_session_request.call_count == 3
+    assert api.retry_stats.deadline_exceeded == 1
+
+
+def test_deadline_passed_during_timeout(create_api, mock_session_request):
+    def timeout(*args, **kwargs):
+        time.sleep(kwargs["timeout"][1])
+        raise requests.exceptions.ReadTimeout()
+
+    mock_session_request.side_effect = timeout
+    api = create_api(retry_policy=RetryPolicy(max_tries=100, base_delay=0.001))
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        api.get_data(KtrPayload(se=["12345678"]), deadline=0.2)
+    assert time.monotonic() - start < 0.4
+
+
+def test_deadline_while_endpoint_is_paused(create_api, mock_session_request):
+    limiter = RateLimiter(requests_per_second=1000, burst=10)
+    api = create_api(rate_limiter=limiter)
+    limiter.pause(api.get_endpoint(KtrPayload(se=["12345678"])), 5)
+    start = time.monotonic()
+    with pytest.raises(DuplaDeadlineExceeded):
+        api.get_data(KtrPayload(se=["12345678"]), deadline=1)
+    assert time.monotonic() - start < 0.5
+    mock_session_request.assert_not_called()
+
+
+def test_deadline_while_rate_limited(create_api, mock_session_request):
+    limiter = RateLimiter(requests_per_second=0.5)
+    api = create_api(rate_limiter=limiter)
+    api.get_data(KtrPayload(se=["12345678"]))
+    start = time.monotonic()
+    # The next request may only be sent after 2 seconds
+    with pytest.raises(DuplaDeadlineExceeded):
+        api.get_data(KtrPayload(se=["12345678"]), deadline=0.3)
+    assert time.monotonic() - start < 0.2
+    assert mock_session_request.call_count == 1
+    # The reservation was given back
+    assert limiter.reserve(api.get_endpoint(KtrPayload(se=["12345678"]))) <= 2
+
+
+def test_deadline_while_waiting_for_free_slot():
+    limiter = RateLimiter(requests_per_second=1000, burst=10, max_concurrent=1)
+    with limiter.limit("key"):
+        start = time.monotonic()
+        with pytest.raises(DuplaDeadlineExceeded):
+            with limiter.limit("key", deadline=Deadline(0.2)):
+                pass
+        assert 0.15 < time.monotonic() - start < 0.4
+    # The slot is free again
+    with limiter.limit("key", deadline=Deadline(0.2)):
+        pass
+
+
+def test_deadline_while_waiting_for_token(create_api, mock_session_request):
+    api = create_api()
+    # Another thread is refreshing the token
+    api._token_lock.acquire()
+    try:
+        start = time.monotonic()
+        with pytest.raises(DuplaDeadlineExceeded):
+            api.get_data(KtrPayload(se=["12345678"]), deadline=0.2)
+        assert time.monotonic() - start < 0.4
+    finally:
+        api._token_lock.release()
+    mock_session_request.assert_not_called()
+
+
+def test_deadline_scope_can_only_shorten():
+    with deadline_scope(1) as outer:
+        with deadline_scope(10) as inner:
+            assert inner is outer
+        with deadline_scope(0.5) as inner:
+            assert inner is not outer
+            assert current_deadline() is inner
+        with deadline_scope(None) as inner:
+            assert inner is outer
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_in_current_context():
+    results = []
+    with deadline_scope(1) as deadline:
+        func = in_current_context(lambda: results.append(current_deadline()))
+    threads = [threading.Thread(target=func) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [deadline] * 3
+
+
+def test_deadline():
+    deadline = Deadline(0.05)
+    assert deadline.timeout((10, 60))[0] <= 0.05
+    assert deadline.timeout(None)[1] <= 0.05
+    time.sleep(0.06)
+    assert deadline.expired()
+    with pytest.raises(DuplaDeadlineExceeded):
+        deadline.timeout((10, 60))
+    with pytest.raises(ValueError):
+        Deadline(0)
+
+
+def test_deadline_exceeded_is_a_timeout():
+    assert issubclass(DuplaDeadlineExceeded, TimeoutError)
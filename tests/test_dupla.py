@@ -1,8 +1,13 @@
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 
 import dupla
 import dupla.version
 from dupla.base import DuplaApiBase
+from dupla.exceptions import DuplaApiAuthenticationException
 
 
 def test_token_refreshed_if_expired(mocked_requests_very_short_expiration_time, mocker):
@@ -45,6 +50,219 @@ def test_token_not_refreshed_if_not_expired(mocked_requests_long_expiration_time
     assert mock_session_request.call_count == 2
 
 
+def test_session_reused_between_requests(mocked_requests_long_expiration_time, mock_session):
+    _, mock_session_request = mocked_requests_long_expiration_time
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    n_sessions = mock_session.call_count
+
+    api.get("http://some_api.dk/url")
+    api.get("http://some_api.dk/url")
+
+    # Only the authentication may open a new session
+    assert mock_session.call_count <= n_sessions + 1
+    assert mock_session_request.call_count == 2
+    request_ids = {c.kwargs["headers"]["X-Request-ID"] for c in mock_session_request.call_args_list}
+    assert len(request_ids) == 2
+    for c in mock_session_request.call_args_list:
+        assert c.kwargs["headers"]["Authorization"] == f"Bearer {api.jwt_token}"
+
+
+def test_close_on_context_exit(mocker, session_object):
+    close_spy = mocker.spy(session_object, "close")
+    with DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    ) as api:
+        assert isinstance(api, DuplaApiBase)
+        assert close_spy.call_count == 0
+    # Both the API and the BAT session are closed (the mocked sessions are the same object)
+    assert close_spy.call_count == 2
+
+
+def test_pkcs12_parsed_once_per_certificate(mock_session_pkcs):
+    apis = [
+        DuplaApiBase(
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            "pkcs12_filename",
+            "pkcs12_password",
+            "http://billetautomat.dk/url",
+            5,
+        )
+        for _ in range(3)
+    ]
+    assert mock_session_pkcs.call_count == 1
+    assert all(api._pkcs12_adapter is apis[0]._pkcs12_adapter for api in apis)
+
+    DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "other_pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    assert mock_session_pkcs.call_count == 2
+
+
+def test_bat_session_reused(mocked_requests_very_short_expiration_time, mock_session):
+    mock_session_post, _ = mocked_requests_very_short_expiration_time
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    n_sessions = mock_session.call_count
+
+    for _ in range(3):
+        api.get("http://some_api.dk/url")
+
+    assert mock_session_post.call_count == 3
+    assert mock_session.call_count == n_sessions
+
+
+def test_token_refresh_is_single_flight(mocked_requests_long_expiration_time, mocker):
+    mock_session_post, mock_session_request = mocked_requests_long_expiration_time
+    token_response = mock_session_post.return_value
+
+    def slow_post(*args, **kwargs):
+        time.sleep(0.1)
+        return token_response
+
+    mock_session_post.side_effect = slow_post
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        list(executor.map(lambda _: api.get("http://some_api.dk/url"), range(32)))
+
+    mock_session_post.assert_called_once()
+    assert mock_session_request.call_count == 32
+    for c in mock_session_request.call_args_list:
+        assert c.kwargs["headers"]["Authorization"] == f"Bearer {api.jwt_token}"
+
+
+def test_failed_refresh_keeps_token(mocked_requests_long_expiration_time, mocker):
+    mock_session_post, _ = mocked_requests_long_expiration_time
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    api.get("http://some_api.dk/url")
+    token, expiration = api.jwt_token, api.token_expiration_time
+
+    failed = mocker.Mock(ok=False, status_code=500, content=b"error")
+    mock_session_post.return_value = failed
+    with pytest.raises(DuplaApiAuthenticationException):
+        api._authenticate()
+    assert api.jwt_token == token
+    assert api.token_expiration_time == expiration
+
+
+def test_token_refresh_stats(mocked_requests_very_short_expiration_time):
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    assert api.token_refresh_stats.refresh_count == 0
+    assert api.token_refresh_stats.mean_seconds is None
+
+    api.get("http://some_api.dk/url")
+    api.get("http://some_api.dk/url")
+
+    stats = api.token_refresh_stats
+    assert stats.refresh_count == 2
+    assert stats.failure_count == 0
+    assert stats.last_seconds is not None
+    assert stats.max_seconds <= stats.total_seconds
+
+
+def test_token_refresh_stats_during_refresh(mocked_requests_very_short_expiration_time):
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+    )
+    # A refresh in progress holds the token lock
+    with api._token_lock:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            stats = executor.submit(lambda: api.token_refresh_stats).result(timeout=1)
+    assert stats.refresh_count == 0
+
+
+def test_background_token_refresh(get_mocked_requests_for_expiration, mocker):
+    mock_session_post, _ = get_mocked_requests_for_expiration(10)
+    api = DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+        background_token_refresh=True,
+        token_refresh_fraction=0.05,
+    )
+    deadline = time.monotonic() + 5
+    while api.token_refresh_stats.refresh_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert api.token_refresh_stats.refresh_count >= 2
+
+    authentication_spy = mocker.spy(api, "_authenticate")
+    api.get("http://some_api.dk/url")
+    # The foreground request used the token from the background refresher
+    assert authentication_spy.call_count == 0
+
+    api.close()
+    assert api._refresher is None
+    n_refreshes = mock_session_post.call_count
+    time.sleep(0.6)
+    assert mock_session_post.call_count == n_refreshes
+
+
+def test_invalid_refresh_fraction():
+    with pytest.raises(ValueError):
+        DuplaApiBase(
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            "pkcs12_filename",
+            "pkcs12_password",
+            "http://billetautomat.dk/url",
+            5,
+            token_refresh_fraction=0,
+        )
+
+
 def test_version_import():
     assert hasattr(dupla, "__version__")
     assert isinstance(dupla.__version__, str)
@@ -0,0 +1,46 @@
+import importlib.util
+
+import pytest
+
+from dupla.endpoint import _parse_response_data
+from dupla.exceptions import DuplaResponseException
+from dupla.json_backend import _FACTORIES, JSON_BACKENDS, get_json_loads
+
+INSTALLED = [name for name in JSON_BACKENDS if importlib.util.find_spec(name) is not None]
+MISSING = [name for name in JSON_BACKENDS if name not in INSTALLED]
+
+
+@pytest.mark.parametrize("backend", INSTALLED)
+def test_backends_decode_bytes(backend):
+    loads = get_json_loads(backend)
+    assert loads('{"data": [{"navn": "Æblegården", "beløb": 1.5}]}'.encode()) == {
+        "data": [{"navn": "Æblegården", "beløb": 1.5}]
+    }
+
+
+def test_default_backend_is_fastest_installed(mocker):
+    # The installed backends return their name instead of a new decoding function
+    mocker.patch.dict(_FACTORIES, {name: (lambda name=name: name) for name in INSTALLED})
+    assert get_json_loads() == INSTALLED[0]
+
+
+@pytest.mark.parametrize("backend", MISSING)
+def test_missing_backend(backend):
+    with pytest.raises(ImportError, match=f"pip install {backend}"):
+        get_json_loads(backend)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_json_loads("yaml")
+
+
+@pytest.mark.parametrize("backend", INSTALLED)
+def test_parse_response_data(backend, create_response):
+    loads = get_json_loads(backend)
+    response = create_response(200, b'{"data": [{"a": 1}]}')
+    assert _parse_response_data(response, loads=loads) == [{"a": 1}]
+
+    for content in (b'{"data": {"a": 1}}', b"not json", b'{"other": []}'):
+        with pytest.raises(DuplaResponseException):
+            _parse_response_data(create_response(200, content), loads=loads)
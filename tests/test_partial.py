@@ -0,0 +1,103 @@
+import pytest
+import requests
+
+import dupla as dp
+from dupla.api_keys import DuplaApiKeys
+from dupla.retry import RetryPolicy, is_bisectable_error
+
+CPR = [f"{i:010d}" for i in range(16)]
+
+
+def http_error(status_code: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+def runner(bad_ids, error):
+    def _run(self, payload, endpoint):
+        ids = payload[DuplaApiKeys.CPR]
+        if set(ids) & set(bad_ids):
+            raise error
+        return [{DuplaApiKeys.CPR: cpr} for cpr in ids]
+
+    return _run
+
+
+@pytest.mark.parametrize("error", [http_error(400), requests.exceptions.ReadTimeout()])
+def test_bad_ids_are_isolated(mock_run_payload, error, build_api):
+    bad_ids = [CPR[3], CPR[12]]
+    mock_run_payload.side_effect = runner(bad_ids, error)
+    result = build_api().get_data_partial(dp.payload.LigPayload(cpr=CPR))
+    assert not result.ok
+    assert result.failed_ids == bad_ids
+    assert result.errors == {cpr: error for cpr in bad_ids}
+    assert [r[DuplaApiKeys.CPR] for r in result.data] == [c for c in CPR if c not in bad_ids]
+    # The payload, its halves, and 2 requests per failing half at each of the 3 levels below
+    assert result.requests == mock_run_payload.call_count == 1 + 2 + 3 * 4
+
+
+def test_timeouts_are_only_retried_for_single_ids(
+    mock_session_request, create_api, create_response
+):
+    bad_id = CPR[3]
+
+    def send(*args, **kwargs):
+        if bad_id in kwargs["params"][DuplaApiKeys.CPR]:
+            raise requests.exceptions.ReadTimeout()
+        return create_response(200)
+
+    mock_session_request.side_effect = send
+    api = create_api(retry_policy=RetryPolicy(max_tries=3, base_delay=0.001))
+    result = api.get_data_partial(dp.payload.LigPayload(cpr=CPR))
+    assert result.failed_ids == [bad_id]
+    attempts = [
+        call
+        for call in mock_session_request.mock_calls
+        if bad_id in call.kwargs["params"][DuplaApiKeys.CPR]
+    ]
+    # One attempt for each of the 16, 8, 4 and 2 IDs, and all 3 for the single ID
+    assert len(attempts) == 4 + 3
+
+
+def test_success_is_one_request(mock_run_payload, build_api):
+    mock_run_payload.side_effect = runner([], None)
+    result = build_api().get_data_partial(dp.payload.LigPayload(cpr=CPR))
+    assert result.ok
+    assert len(result.data) == 16
+    assert result.requests == 1
+
+
+@pytest.mark.parametrize("status", [401, 403, 404, 405, 429, 500])
+def test_other_errors_are_not_split(mock_run_payload, status, build_api):
+    error = http_error(status)
+    # E.g. a 403 fails for any of the IDs
+    mock_run_payload.side_effect = runner(CPR, error)
+    result = build_api().get_data_partial(dp.payload.LigPayload(cpr=CPR))
+    assert result.failed_ids == CPR
+    assert result.data == []
+    assert mock_run_payload.call_count == 1
+
+
+def test_chunks_are_split_separately(mock_run_payload, mocker, build_api):
+    mocker.patch.object(dp.payload.LigPayload, "chunk_size", 4)
+    mock_run_payload.side_effect = runner([CPR[5]], http_error(422))
+    result = build_api().get_data_partial(dp.payload.LigPayload(cpr=CPR))
+    assert result.failed_ids == [CPR[5]]
+    assert len(result.data) == 15
+    # 4 chunks, and 2 levels of halves in the failing chunk
+    assert result.requests == 4 + 4
+
+
+def test_is_bisectable_error():
+    assert is_bisectable_error(http_error(400))
+    assert is_bisectable_error(http_error(413))
+    assert is_bisectable_error(http_error(414))
+    assert is_bisectable_error(http_error(422))
+    assert is_bisectable_error(requests.exceptions.ConnectTimeout())
+    assert not is_bisectable_error(http_error(403))
+    assert not is_bisectable_error(http_error(404))
+    assert not is_bisectable_error(http_error(429))
+    assert not is_bisectable_error(http_error(503))
+    assert not is_bisectable_error(requests.exceptions.ConnectionError())
+    assert not is_bisectable_error(ValueError())
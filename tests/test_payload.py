@@ -1,12 +1,20 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from typing import Optional
+from urllib.parse import urlencode
 
 import pytest
 from pydantic import ValidationError
 
-from dupla.abstract_payload import BasePayload
+from dupla.abstract_payload import BasePayload, split_date_range
 from dupla.api_keys import DuplaApiKeys
-from dupla.custom_types import CPR_T, CVR_T, SE_T
-from dupla.payload import ENDP_T
+from dupla.custom_types import CPR_T, CVR_T, SE_T, validate_ids
+from dupla.payload import (
+    ENDP_T,
+    KtrPayload,
+    MomsPayload,
+    VirksomhedspligterPayload,
+    VirksomhedsstatusPayload,
+)
 
 
 class DummyBase(BasePayload):
@@ -137,3 +145,272 @@ def test_datetime(val):
 def test_invalid_datetime(val):
     with pytest.raises(ValidationError):
         DummyDatetime(dt=val)
+
+
+class DummyChunked(DummyBase):
+    chunk_size = 10
+
+    se: SE_T
+    cvr: Optional[CVR_T] = None
+
+
+def test_no_chunks_for_short_list():
+    obj = DummyChunked(se=["12345678"] * 10)
+    chunks = obj.get_payload_chunks("https://api.skat.dk/dummy")
+    assert chunks == [obj.get_payload()]
+
+
+def test_chunks_by_count():
+    se = [f"{i:08d}" for i in range(25)]
+    cvr = ["87654321"]
+    obj = DummyChunked(se=se, cvr=cvr)
+    assert obj.get_id_field() == "se"
+
+    chunks = obj.get_payload_chunks("https://api.skat.dk/dummy")
+    assert [len(c[DuplaApiKeys.SE]) for c in chunks] == [10, 10, 5]
+    assert [i for c in chunks for i in c[DuplaApiKeys.SE]] == se
+    # The other ID list is sent with every chunk
+    assert all(c[DuplaApiKeys.CVR] == cvr for c in chunks)
+
+
+def test_chunks_by_url_length(mocker):
+    mocker.patch.object(DummyChunked, "chunk_size", None)
+    assert DummyChunked(se=["12345678"] * 1000).get_payload_chunks("dummy") == [
+        DummyChunked(se=["12345678"] * 1000).get_payload()
+    ]
+
+    mocker.patch.object(DummyChunked, "chunk_size", 1000)
+    mocker.patch.object(DummyChunked, "max_url_length", 500)
+    endpoint = "https://api.skat.dk/dummy"
+    se = [f"{i:08d}" for i in range(1000)]
+    chunks = DummyChunked(se=se).get_payload_chunks(endpoint)
+    assert len(chunks) > 1
+    assert [i for c in chunks for i in c[DuplaApiKeys.SE]] == se
+    for chunk in chunks:
+        assert len(endpoint) + 1 + len(urlencode(chunk, doseq=True)) <= 500
+
+
+@pytest.mark.parametrize(
+    "start,end,window,expected",
+    [
+        (
+            date(2022, 11, 15),
+            date(2023, 2, 3),
+            "month",
+            [
+                (date(2022, 11, 15), date(2022, 11, 30)),
+                (date(2022, 12, 1), date(2022, 12, 31)),
+                (date(2023, 1, 1), date(2023, 1, 31)),
+                (date(2023, 2, 1), date(2023, 2, 3)),
+            ],
+        ),
+        (
+            date(2022, 2, 1),
+            date(2022, 7, 1),
+            "quarter",
+            [
+                (date(2022, 2, 1), date(2022, 3, 31)),
+                (date(2022, 4, 1), date(2022, 6, 30)),
+                (date(2022, 7, 1), date(2022, 7, 1)),
+            ],
+        ),
+        (
+            date(2020, 6, 1),
+            date(2021, 1, 1),
+            "year",
+            [(date(2020, 6, 1), date(2020, 12, 31)), (date(2021, 1, 1), date(2021, 1, 1))],
+        ),
+        (
+            date(2023, 1, 1),
+            date(2023, 1, 20),
+            timedelta(days=7),
+            [
+                (date(2023, 1, 1), date(2023, 1, 7)),
+                (date(2023, 1, 8), date(2023, 1, 14)),
+                (date(2023, 1, 15), date(2023, 1, 20)),
+            ],
+        ),
+        (date(2023, 1, 2), date(2023, 1, 1), "month", []),
+    ],
+)
+def test_split_date_range(start, end, window, expected):
+    assert split_date_range(start, end, window) == expected
+
+
+@pytest.mark.parametrize("window", [timedelta(hours=1), "week"])
+def test_invalid_date_window(window):
+    with pytest.raises(ValueError):
+        split_date_range(date(2023, 1, 1), date(2023, 2, 1), window)
+
+
+def test_payload_date_windows():
+    obj = MomsPayload(se=["12345678"], afregning_start="2023-01-15", afregning_slut="2023-03-31")
+    chunks = obj.get_payload_chunks("https://api.skat.dk/Momsangivelse", date_window="month")
+    assert [(c[DuplaApiKeys.AFREGNING_START], c[DuplaApiKeys.AFREGNING_SLUT]) for c in chunks] == [
+        ("2023-01-15", "2023-01-31"),
+        ("2023-02-01", "2023-02-28"),
+        ("2023-03-01", "2023-03-31"),
+    ]
+    assert all(c[DuplaApiKeys.SE] == ["12345678"] for c in chunks)
+
+
+def test_payload_open_date_range_not_split():
+    obj = KtrPayload(se=["12345678"], registrering_fra="2020-01-01")
+    assert obj.get_date_windows("month") == []
+    assert obj.get_payload_chunks("dummy", date_window="month") == [obj.get_payload()]
+
+
+@pytest.mark.parametrize(
+    "ids",
+    [
+        [f"{i:08d}" for i in range(1000)],
+        [12345678, "87654321", b"11223344"],
+        # Accepted by int(), as before the bulk validation
+        ["+1234567", " 1234567"],
+        [],
+    ],
+)
+def test_validate_ids(ids):
+    validated = validate_ids(ids, 8)
+    assert validated == [str(i) if isinstance(i, int) else i for i in validated]
+    assert len(validated) == len(ids)
+    assert DummySE(se=ids).se == validated
+
+
+def test_validate_ids_reports_all_invalid():
+    ids = [f"{i:08d}" for i in range(100)]
+    ids[3] = "1234567"
+    ids[42] = "1234abcd"
+    ids[99] = "1234\n678"
+    with pytest.raises(ValueError) as exc_info:
+        validate_ids(ids, 8)
+    message = str(exc_info.value)
+    assert message.startswith("3 invalid IDs")
+    assert all(f"{index}: " in message for index in (3, 42, 99))
+
+    with pytest.raises(ValidationError, match="3 invalid IDs"):
+        DummySE(se=ids)
+
+
+@pytest.mark.parametrize("value", [None, 1.5, ["12345678"]])
+def test_invalid_id_types(value):
+    with pytest.raises(TypeError):
+        validate_ids(["12345678", value], 8)
+    with pytest.raises(ValidationError):
+        DummySE(se=["12345678", value])
+
+
+@pytest.mark.parametrize(
+    "make", [set, frozenset, tuple, lambda ids: (i for i in ids), lambda ids: iter(ids)]
+)
+def test_other_iterables_of_ids(make):
+    assert DummySE(se=make(["12345678"])).se == ["12345678"]
+    with pytest.raises(ValidationError, match="1 invalid IDs"):
+        DummySE(se=make(["zz"]))
+    with pytest.raises(ValidationError):
+        MomsPayload(se=make(["abc"]), afregning_start="2023-01-01", afregning_slut="2023-03-31")
+
+
+@pytest.mark.parametrize("value", ["12345678", b"12345678", {"12345678": 1}, 12345678])
+def test_ids_not_in_a_list(value):
+    with pytest.raises(ValidationError):
+        DummySE(se=value)
+
+
+def test_deduplicate_ids(mocker):
+    ids = ["22222222", "11111111", "22222222", 11111111]
+    assert validate_ids(ids, 8, deduplicate=True) == ["22222222", "11111111"]
+
+    assert KtrPayload(se=ids).se == ["22222222", "11111111", "22222222", "11111111"]
+    mocker.patch.object(KtrPayload, "deduplicate_ids", True)
+    assert KtrPayload(se=ids, cvr=ids).se == ["22222222", "11111111"]
+    assert KtrPayload(se=ids, cvr=ids).cvr == ["22222222", "11111111"]
+
+
+def test_template_with_ids():
+    template = MomsPayload.template(afregning_start="2023-01-01", afregning_slut="2023-03-31")
+    assert template.se == []
+
+    payload = template.with_ids(se=["12345678", 87654321])
+    expected = MomsPayload(
+        se=["12345678", "87654321"], afregning_start="2023-01-01", afregning_slut="2023-03-31"
+    )
+    assert payload == expected
+    assert payload.get_payload() == expected.get_payload()
+    assert payload == expected
+    # The template is unchanged
+    assert template.se == []
+    assert template.get_payload()[DuplaApiKeys.SE] == []
+
+
+def test_with_ids_validates_ids():
+    template = KtrPayload.template(registrering_fra="2023-01-01")
+    assert template.with_ids(cvr=["12345678"]).get_payload() == {
+        DuplaApiKeys.SE: [],
+        DuplaApiKeys.CVR: ["12345678"],
+        DuplaApiKeys.TEKNISK_REGISTRERING_FRA: "2023-01-01",
+    }
+    with pytest.raises(ValueError, match="1 invalid IDs"):
+        template.with_ids(se=["1234"])
+    with pytest.raises(ValueError):
+        template.with_ids(cpr=["1234567890"])
+
+
+def test_serialized_payload_is_cached(mocker):
+    payload = KtrPayload(se=["12345678"])
+    dump = mocker.spy(KtrPayload, "model_dump")
+    first = payload.get_payload()
+    first[DuplaApiKeys.CVR] = ["changed"]
+    assert payload.get_payload() == {DuplaApiKeys.SE: ["12345678"]}
+    assert dump.call_count == 1
+
+    # Changing a field resets the cache
+    payload.registrering_fra = date(2023, 1, 1)
+    assert payload.get_payload()[DuplaApiKeys.TEKNISK_REGISTRERING_FRA] == "2023-01-01"
+    copy = payload.model_copy(update={"se": ["87654321"]})
+    assert copy.get_payload()[DuplaApiKeys.SE] == ["87654321"]
+
+
+def test_serialized_payload_follows_ids_changed_in_place():
+    payload = KtrPayload(se=["12345678"])
+    assert payload.get_payload()[DuplaApiKeys.SE] == ["12345678"]
+    payload.se.append("87654321")
+    assert payload.get_payload()[DuplaApiKeys.SE] == ["12345678", "87654321"]
+
+    template = MomsPayload.template(afregning_start="2023-01-01", afregning_slut="2023-03-31")
+    moms = template.with_ids(se=["12345678"])
+    moms.se[0] = "87654321"
+    assert moms.get_payload()[DuplaApiKeys.SE] == ["87654321"]
+
+
+def test_serialized_payload_cannot_be_changed_by_callers():
+    payload = KtrPayload(se=["12345678"])
+    payload.get_payload()[DuplaApiKeys.SE].append("87654321")
+    assert payload.get_payload()[DuplaApiKeys.SE] == ["12345678"]
+    assert payload.se == ["12345678"]
+
+
+def test_serialized_payload_follows_lists_changed_in_place():
+    payload = VirksomhedspligterPayload(cvr=["12345678"], pligt_kode=[1, 2])
+    assert payload.get_payload()[DuplaApiKeys.PLIGT_KODE] == [1, 2]
+    payload.pligt_kode.append(3)
+    assert payload.get_payload()[DuplaApiKeys.PLIGT_KODE] == [1, 2, 3]
+
+    status = VirksomhedsstatusPayload(se=["12345678"], status_type_kode=[1])
+    assert status.get_payload()[DuplaApiKeys.STATUS_TYPE_KODE] == [1]
+    status.status_type_kode[0] = 2
+    assert status.get_payload()[DuplaApiKeys.STATUS_TYPE_KODE] == [2]
+
+
+def test_serialized_lists_cannot_be_changed_by_callers():
+    template = VirksomhedspligterPayload.template(pligt_kode=[1, 2])
+    payload = template.with_ids(cvr=["12345678"])
+    payload.get_payload()[DuplaApiKeys.PLIGT_KODE].append(99)
+    template.get_payload()[DuplaApiKeys.PLIGT_KODE].append(99)
+    assert payload.get_payload()[DuplaApiKeys.PLIGT_KODE] == [1, 2]
+    assert template.get_payload()[DuplaApiKeys.PLIGT_KODE] == [1, 2]
+
+    # The payloads created from a template don't share its lists
+    template.pligt_kode.append(3)
+    assert payload.pligt_kode == [1, 2]
+    assert payload.get_payload()[DuplaApiKeys.PLIGT_KODE] == [1, 2]
@@ -0,0 +1,167 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from dupla.payload import KtrPayload
+from dupla.ratelimit import FileRateLimitBackend, MemoryRateLimitBackend, RateLimiter
+
+
+def test_rate_is_limited():
+    limiter = RateLimiter(requests_per_second=50, burst=5)
+    start = time.monotonic()
+    for _ in range(30):
+        limiter.acquire("key")
+    elapsed = time.monotonic() - start
+    # The first 5 requests are a burst, the remaining 25 are spaced by 1/50 s
+    assert elapsed >= 25 / 50 * 0.9
+
+
+def test_keys_are_independent():
+    limiter = RateLimiter(requests_per_second=1)
+    assert limiter.reserve("a") == 0
+    assert limiter.reserve("b") == 0
+    assert limiter.reserve("a") > 0.5
+
+
+def test_pause():
+    limiter = RateLimiter(requests_per_second=1000, burst=10)
+    limiter.pause("key", 0.3)
+    assert limiter.pause_remaining("key") > 0.2
+    start = time.monotonic()
+    limiter.acquire("key")
+    assert time.monotonic() - start >= 0.25
+    # Other keys are not paused
+    assert limiter.reserve("other") == 0
+
+
+def test_waiting_requests_are_spaced_after_pause():
+    limiter = RateLimiter(requests_per_second=10)
+    sent = []
+
+    def work(_):
+        limiter.acquire("key")
+        sent.append(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(work, i) for i in range(6)]
+        # The requests have reserved their slots, the first one is sent
+        time.sleep(0.05)
+        pause_end = time.monotonic() + 0.5
+        limiter.pause("key", 0.5)
+        for future in futures:
+            future.result()
+
+    resumed = sorted(t for t in sent if t >= pause_end)
+    assert len(resumed) == 5
+    assert all(b - a >= 0.09 for a, b in zip(resumed, resumed[1:]))
+
+
+def test_max_concurrent():
+    limiter = RateLimiter(requests_per_second=1000, burst=100, max_concurrent=3)
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def work(_):
+        nonlocal in_flight, max_in_flight
+        with limiter.limit("key"):
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(work, range(30)))
+    assert max_in_flight == 3
+
+
+def acquire_many(directory: str, n: int) -> float:
+    """Acquire n requests from a file backed limiter, and return the time of the last one."""
+    limiter = RateLimiter(requests_per_second=40, backend=FileRateLimitBackend(directory))
+    for _ in range(n):
+        limiter.acquire("key")
+    return time.time()
+
+
+def test_file_backend_shared_between_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=ctx) as executor:
+        # Warm up the processes, so the start-up time is not measured
+        list(executor.map(time.sleep, [0.1] * 3))
+        start = time.time()
+        ends = list(executor.map(acquire_many, [str(tmp_path)] * 3, [10] * 3))
+    # 30 requests at 40 per second, rather than 10 per process
+    assert max(ends) - start >= 29 / 40 * 0.9
+
+
+def test_file_backend_pause_seen_by_other_process(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        executor.submit(time.sleep, 0.1).result()
+        # E.g. a Retry-After header received in this process
+        start = time.time()
+        RateLimiter(1, backend=FileRateLimitBackend(str(tmp_path))).pause("key", 0.5)
+        end = executor.submit(acquire_many, str(tmp_path), 1).result()
+    assert end - start >= 0.45
+
+
+@pytest.mark.parametrize("backend", [MemoryRateLimitBackend, FileRateLimitBackend])
+def test_backend_pause(backend, tmp_path):
+    backend = backend(str(tmp_path)) if backend is FileRateLimitBackend else backend()
+    limiter = RateLimiter(requests_per_second=1000, burst=10, backend=backend)
+    assert limiter.pause_remaining("key") == 0
+    limiter.pause("key", 0.3)
+    start = time.monotonic()
+    limiter.acquire("key")
+    assert time.monotonic() - start >= 0.25
+
+
+@pytest.mark.parametrize("kwargs", [{"requests_per_second": 0}, {"burst": 0}])
+def test_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        RateLimiter(**{"requests_per_second": 1, **kwargs})
+
+
+def test_retry_after_pauses_endpoint(mocker, create_api, create_response, mock_session_request):
+    mock_session_request.side_effect = [
+        create_response(429, b"", {"Retry-After": "0.3"}),
+        create_response(200),
+    ]
+    limiter = RateLimiter(requests_per_second=1000, burst=10)
+    pause_spy = mocker.spy(limiter, "pause")
+    api = create_api(max_tries=2, rate_limiter=limiter)
+
+    start = time.monotonic()
+    assert api.get_data(KtrPayload(se=["12345678"])) == []
+    assert time.monotonic() - start >= 0.25
+    pause_spy.assert_called_once_with("https://dummy.com/Kontrolregistreringer/Virksomhed", 0.3)
+    assert mock_session_request.call_count == 2
+
+
+@pytest.mark.parametrize("backend", [MemoryRateLimitBackend, FileRateLimitBackend])
+def test_pause_remaining_keeps_the_burst(backend, tmp_path):
+    backend = backend(str(tmp_path)) if backend is FileRateLimitBackend else backend()
+    limiter = RateLimiter(requests_per_second=1, burst=3, backend=backend)
+    assert limiter.pause_remaining("key") == 0
+    # The first requests are still a burst
+    assert [limiter.reserve("key") for _ in range(3)] == [0, 0, 0]
+
+
+def test_pause_remaining_does_not_write(tmp_path):
+    limiter = RateLimiter(requests_per_second=1, backend=FileRateLimitBackend(str(tmp_path)))
+    assert limiter.pause_remaining("key") == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_deadline_keeps_the_burst(create_api, mock_session_request):
+    limiter = RateLimiter(requests_per_second=1, burst=3)
+    api = create_api(rate_limiter=limiter)
+    start = time.monotonic()
+    for _ in range(3):
+        api.get_data(KtrPayload(se=["12345678"]), deadline=5)
+    assert time.monotonic() - start < 0.5
@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+import dupla as dp
+from dupla.api_keys import DuplaApiKeys
+from dupla.exceptions import DuplaResponseException
+from dupla.response import MomsResponse, VirksomhedResponse, parse_records
+
+RECORDS = [
+    {
+        DuplaApiKeys.SE: "12345678",
+        DuplaApiKeys.AFREGNING_START: "2023-01-01",
+        DuplaApiKeys.AFREGNING_SLUT: "2023-03-31",
+        "MomsAngivelseBeløb": 1250.5,
+    },
+    {DuplaApiKeys.SE: "87654321", DuplaApiKeys.CVR: "11223344"},
+]
+
+
+def moms_payload() -> dp.payload.MomsPayload:
+    return dp.payload.MomsPayload(
+        se=["12345678"], afregning_start=date(2023, 1, 1), afregning_slut=date(2023, 3, 31)
+    )
+
+
+def test_parse_records():
+    first, second = parse_records(MomsResponse, RECORDS)
+    assert first.se == "12345678"
+    assert first.afregning_start == date(2023, 1, 1)
+    assert first.model_extra == {"MomsAngivelseBeløb": 1250.5}
+    assert (second.cvr, second.afregning_start) == ("11223344", None)
+    # The records are kept when serialized by alias
+    assert first.model_dump(by_alias=True, exclude_unset=True) == {
+        **RECORDS[0],
+        DuplaApiKeys.AFREGNING_START: date(2023, 1, 1),
+        DuplaApiKeys.AFREGNING_SLUT: date(2023, 3, 31),
+    }
+
+
+def test_parse_records_trusted():
+    first, second = parse_records(MomsResponse, RECORDS, trusted=True)
+    assert isinstance(first, MomsResponse)
+    assert first.se == "12345678"
+    # No validation, so the dates are kept as strings
+    assert first.afregning_start == "2023-01-01"
+    assert first.model_extra == {"MomsAngivelseBeløb": 1250.5}
+    assert second.afregning_start is None
+
+
+def test_payload_classes_have_response_models():
+    assert dp.payload.MomsPayload.response_model is MomsResponse
+    assert dp.payload.KtrPayload.response_model is VirksomhedResponse
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_get_models(mock_run_payload, trusted, build_api):
+    mock_run_payload.return_value = RECORDS
+    models = build_api().get_models(moms_payload(), trusted=trusted)
+    assert [model.se for model in models] == ["12345678", "87654321"]
+    assert all(isinstance(model, MomsResponse) for model in models)
+
+
+def test_get_models_invalid_record(mock_run_payload, build_api):
+    mock_run_payload.return_value = [{DuplaApiKeys.AFREGNING_START: "not a date"}]
+    with pytest.raises(DuplaResponseException, match="MomsResponse"):
+        build_api().get_models(moms_payload())
+
+
+def test_get_models_without_model(mocker, mock_run_payload, build_api):
+    mocker.patch.object(dp.payload.MomsPayload, "response_model", None)
+    with pytest.raises(ValueError):
+        build_api().get_models(moms_payload())
+    mock_run_payload.assert_not_called()
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+import requests
+
+from dupla.payload import KtrPayload
+from dupla.retry import RetryBudget, RetryPolicy
+
+
+def test_max_tries_is_total_attempts(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(500)
+    api = create_api(retry_policy=RetryPolicy(max_tries=3, base_delay=0.001))
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        api.get_data(KtrPayload(se=["12345678"]))
+    assert mock_session_request.call_count == 3
+    assert e.value.attempts == 3
+    stats = api.retry_stats
+    assert (stats.calls, stats.attempts, stats.retries, stats.failures) == (1, 3, 2, 1)
+
+
+def test_client_error_is_not_retried(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(404)
+    api = create_api(retry_policy=RetryPolicy(max_tries=3, base_delay=0.001))
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        api.get_data(KtrPayload(se=["12345678"]))
+    assert mock_session_request.call_count == 1
+    assert e.value.attempts == 1
+
+
+def test_network_error_is_retried(create_api, mock_session_request, create_response):
+    mock_session_request.side_effect = [
+        requests.exceptions.ConnectionError(),
+        requests.exceptions.Timeout(),
+        create_response(200),
+    ]
+    api = create_api(retry_policy=RetryPolicy(max_tries=3, base_delay=0.001))
+    assert api.get_data(KtrPayload(se=["12345678"])) == []
+    assert mock_session_request.call_count == 3
+
+
+def test_retry_after_is_respected(create_api, mock_session_request, create_response):
+    mock_session_request.side_effect = [
+        create_response(503, b"", {"Retry-After": "0.3"}),
+        create_response(200),
+    ]
+    # The backoff alone would retry almost immediately
+    api = create_api(retry_policy=RetryPolicy(max_tries=2, base_delay=0.001))
+    start = time.monotonic()
+    assert api.get_data(KtrPayload(se=["12345678"])) == []
+    assert time.monotonic() - start >= 0.25
+
+
+def test_deadline(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(429, b"", {"Retry-After": "10"})
+    api = create_api(retry_policy=RetryPolicy(max_tries=5, deadline=1))
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError):
+        api.get_data(KtrPayload(se=["12345678"]))
+    assert time.monotonic() - start < 1
+    assert mock_session_request.call_count == 1
+    assert api.retry_stats.deadline_exceeded == 1
+
+
+def test_max_total_sleep(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(429, b"", {"Retry-After": "0.05"})
+    api = create_api(retry_policy=RetryPolicy(max_tries=10, max_total_sleep=0.12))
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        api.get_data(KtrPayload(se=["12345678"]))
+    # Two retries of 0.05 seconds fit in the total sleep
+    assert e.value.attempts == 3
+
+
+def test_budget_is_shared(create_api, mock_session_request, create_response):
+    mock_session_request.return_value = create_response(500)
+    budget = RetryBudget(ratio=0, min_retries_per_second=0, max_tokens=3)
+    policy = RetryPolicy(max_tries=10, base_delay=0.001, budget=budget)
+    api1 = create_api(retry_policy=policy)
+    api2 = create_api(retry_policy=RetryPolicy(max_tries=10, base_delay=0.001, budget=budget))
+    with pytest.raises(requests.exceptions.HTTPError):
+        api1.get_data(KtrPayload(se=["12345678"]))
+    with pytest.raises(requests.exceptions.HTTPError):
+        api2.get_data(KtrPayload(se=["12345678"]))
+    # 2 first attempts, and the 3 retries of the budget
+    assert mock_session_request.call_count == 5
+    assert api1.retry_stats.budget_exhausted == 1
+    assert api2.retry_stats.budget_exhausted == 1
+
+
+def test_budget_refills_with_requests():
+    budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_tokens=1)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_retry()
+
+
+def test_backoff_has_full_jitter():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    delays = [policy.backoff(4) for _ in range(1000)]
+    assert all(0 <= d <= 5 for d in delays)
+    assert min(delays) < 1 and max(delays) > 4
+
+
+def test_invalid_max_tries():
+    with pytest.raises(ValueError):
+        RetryPolicy(max_tries=0)
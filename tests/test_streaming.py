@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+import requests
+
+from dupla.api_keys import DuplaApiKeys
+from dupla.exceptions import DuplaResponseException
+from dupla.payload import KtrPayload
+from dupla.streaming import NotAListError, iter_json_array
+
+RECORDS = [{"id": i, "name": f"Virksomhed {i}", "values": [i, 1.5, None, True]} for i in range(50)]
+
+
+def chunked(content: bytes, size: int):
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1024])
+def test_iter_json_array(size):
+    content = json.dumps({"meta": {"count": 50, "ids": [1, 2]}, "data": RECORDS, "more": 1})
+    assert list(iter_json_array(chunked(content.encode(), size))) == RECORDS
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ('{"data": []}', []),
+        (' { "data" : [ 1 , 23456 , "æøå" ] } ', [1, 23456, "æøå"]),
+        ('{"other": 12345, "data": [{"a": "\\u00e6"}]}', [{"a": "æ"}]),
+    ],
+)
+def test_iter_json_array_values(content, expected):
+    assert list(iter_json_array(chunked(content.encode(), 1))) == expected
+
+
+def test_iter_json_array_is_incremental():
+    def chunks():
+        yield b'{"data": [{"a": 1},'
+        yield b'{"a": 2}'
+        raise AssertionError("Read too far")
+
+    iterator = iter_json_array(chunks())
+    assert next(iterator) == {"a": 1}
+
+
+@pytest.mark.parametrize(
+    "content, error",
+    [
+        ('{"data": {"a": 1}}', NotAListError),
+        ('{"data": null}', NotAListError),
+        ('{"other": []}', ValueError),
+        ("{}", ValueError),
+        ('{"data": [{"a": 1}', ValueError),
+        ('{"data": [{"a": }]}', ValueError),
+        ("[]", ValueError),
+    ],
+)
+def test_iter_json_array_invalid(content, error):
+    with pytest.raises(error):
+        list(iter_json_array(chunked(content.encode(), 3)))
+
+
+def create_streamed_response(content: bytes, status_code: int = 200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(content)
+    return response
+
+
+def test_iter_data(mock_session_request, mocked_requests_long_expiration_time, build_api):
+    mock_session_request.return_value = create_streamed_response(
+        json.dumps({"data": RECORDS}).encode()
+    )
+    api = build_api(max_tries=2)
+
+    assert list(api.iter_data(KtrPayload(se=["12345678"]))) == RECORDS
+    assert mock_session_request.call_args.kwargs["stream"] is True
+
+
+def test_iter_data_chunks(
+    mocker, mock_session_request, mocked_requests_long_expiration_time, build_api
+):
+    mocker.patch.object(KtrPayload, "chunk_size", 2)
+    mock_session_request.side_effect = lambda method, url, params, **kwargs: (
+        create_streamed_response(
+            json.dumps({"data": [{"se": se} for se in params[DuplaApiKeys.SE]]}).encode()
+        )
+    )
+    se = [f"{i:08d}" for i in range(5)]
+
+    records = list(build_api(max_tries=2).iter_data(KtrPayload(se=se)))
+    assert records == [{"se": i} for i in se]
+    assert mock_session_request.call_count == 3
+
+
+def test_iter_data_retries(mock_session_request, mocked_requests_long_expiration_time, build_api):
+    mock_session_request.side_effect = [
+        create_streamed_response(b"", status_code=503),
+        create_streamed_response(b'{"data": [{"a": 1}]}'),
+    ]
+    assert list(build_api(max_tries=2).iter_data(KtrPayload(se=["12345678"]))) == [{"a": 1}]
+
+
+@pytest.mark.parametrize("content", [b'{"data": {"a": 1}}', b'{"data": [{"a": 1}, {"a"'])
+def test_iter_data_invalid_response(
+    mock_session_request, mocked_requests_long_expiration_time, content, build_api
+):
+    mock_session_request.return_value = create_streamed_response(content)
+    with pytest.raises(DuplaResponseException) as exc_info:
+        list(build_api(max_tries=2).iter_data(KtrPayload(se=["12345678"])))
+    assert exc_info.value.response is mock_session_request.return_value
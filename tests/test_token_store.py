@@ -0,0 +1,86 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from dupla.base import DuplaApiBase
+from dupla.timestamp import get_utc_now
+from dupla.token_store import FileTokenStore, StoredToken, token_store_key
+
+
+@pytest.fixture
+def mock_fingerprint(mocker):
+    return mocker.patch("dupla.base.get_certificate_fingerprint", return_value="fingerprint")
+
+
+def build_api(token_store, **kwargs) -> DuplaApiBase:
+    return DuplaApiBase(
+        str(uuid.uuid4()),
+        str(uuid.uuid4()),
+        "pkcs12_filename",
+        "pkcs12_password",
+        "http://billetautomat.dk/url",
+        5,
+        token_store=token_store,
+        **kwargs,
+    )
+
+
+def test_file_store_roundtrip(tmp_path):
+    store = FileTokenStore(str(tmp_path / "tokens"))
+    key = token_store_key("http://billetautomat.dk/url", "fingerprint")
+    assert store.load(key) is None
+
+    token = StoredToken("token", get_utc_now() + timedelta(seconds=60), 60.0)
+    with store.lock(key):
+        store.save(key, token)
+    assert store.load(key) == token
+
+
+def test_file_store_ignores_corrupt_file(tmp_path):
+    store = FileTokenStore(str(tmp_path))
+    key = token_store_key("http://billetautomat.dk/url", "fingerprint")
+    (tmp_path / f"{key}.json").write_text("not json")
+    assert store.load(key) is None
+
+
+def test_key_depends_on_url_and_certificate():
+    key = token_store_key("http://billetautomat.dk/url", "fingerprint")
+    assert key == token_store_key("http://billetautomat.dk/url", "fingerprint")
+    assert key != token_store_key("http://billetautomat.dk/other", "fingerprint")
+    assert key != token_store_key("http://billetautomat.dk/url", "other")
+
+
+def test_token_shared_between_clients(
+    tmp_path, mock_fingerprint, mocked_requests_long_expiration_time
+):
+    mock_session_post, _ = mocked_requests_long_expiration_time
+    store = FileTokenStore(str(tmp_path))
+
+    api1 = build_api(store)
+    api1.get("http://some_api.dk/url")
+    api2 = build_api(store)
+    api2.get("http://some_api.dk/url")
+
+    mock_session_post.assert_called_once()
+    assert api2.jwt_token == api1.jwt_token
+    assert api2.token_expiration_time == api1.token_expiration_time
+    assert api2.token_refresh_stats.store_hit_count == 1
+    assert api2.token_refresh_stats.refresh_count == 0
+
+
+def test_expired_stored_token_not_used(
+    tmp_path, mock_fingerprint, mocked_requests_long_expiration_time
+):
+    mock_session_post, _ = mocked_requests_long_expiration_time
+    store = FileTokenStore(str(tmp_path))
+    key = token_store_key("http://billetautomat.dk/url", "fingerprint")
+    # Expires within the overlap time of the client
+    store.save(key, StoredToken("old-token", get_utc_now() + timedelta(seconds=2), 60.0))
+
+    api = build_api(store)
+    api.get("http://some_api.dk/url")
+
+    mock_session_post.assert_called_once()
+    assert api.jwt_token != "old-token"
+    assert store.load(key).access_token == api.jwt_token